@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import io
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from sod_utils.sod_cache import SodCache
+from sod_utils.sod_io import SodIO
+
+
+def build_mesh_blocks(n_vertices: int, n_faces: int, seed=0):
+    rng = random.Random(seed)
+    vertices = struct.pack(f'<{n_vertices * 3}f', *(rng.uniform(-100, 100) for _ in range(n_vertices * 3)))
+    uvs = struct.pack(f'<{n_vertices * 2}f', *(rng.random() for _ in range(n_vertices * 2)))
+    faces = struct.pack(f'<{n_faces * 6}H', *(rng.randrange(n_vertices) for _ in range(n_faces * 6)))
+    return vertices, uvs, faces
+
+
+def decode_per_element(sod_io: SodIO, blocks, n_vertices: int, n_faces: int):
+    """the old decoding path: one read and one struct.unpack per float/uint16"""
+    vertices, uvs, faces = (io.BytesIO(block) for block in blocks)
+    return ([sod_io.read_vector3(vertices) for _ in range(n_vertices)],
+            [sod_io.read_vector2(uvs) for _ in range(n_vertices)],
+            [sod_io.read_face_vertex_array(3, faces) for _ in range(n_faces)])
+
+
+def decode_bulk(sod_io: SodIO, blocks, n_vertices: int, n_faces: int):
+    vertices, uvs, faces = (io.BytesIO(block) for block in blocks)
+    return (sod_io.read_vector3_array(n_vertices, vertices),
+            sod_io.read_vector2_array(n_vertices, uvs),
+            sod_io.read_face_array(n_faces, faces))
+
+
+def time_ms(func, *args, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter_ns()
+        result = func(*args)
+        elapsed = (time.perf_counter_ns() - start_time) / 1e+6
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_mesh_decoding(n_vertices=20000, n_faces=30000):
+    print(f"decoding mesh blocks with {n_vertices} vertices, {n_vertices} uvs and {n_faces} faces...")
+    sod_io = SodIO()
+    blocks = build_mesh_blocks(n_vertices, n_faces)
+
+    per_element_ms, expected = time_ms(decode_per_element, sod_io, blocks, n_vertices, n_faces)
+    bulk_ms, result = time_ms(decode_bulk, sod_io, blocks, n_vertices, n_faces)
+    assert result == expected, "bulk decoding differs from per element decoding"
+
+    print(f"per element: {per_element_ms:.2f} ms")
+    print(f"bulk:        {bulk_ms:.2f} ms ({per_element_ms / bulk_ms:.1f}x faster)")
+
+
+def bench_read_file(file_path: str):
+    print(f"\nparsing {file_path}...")
+    parse_ms, _ = time_ms(SodIO().read_file, file_path)
+    print(f"read_file: {parse_ms:.2f} ms")
+
+
+def bench_write(file_path: str):
+    sod_io = SodIO()
+    sod = sod_io.read_file(file_path)
+    write_ms, _ = time_ms(sod_io.write_bytes, sod)
+    print(f"write_bytes: {write_ms:.2f} ms")
+
+
+def bench_cache(file_paths):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SodCache(cache_dir, sod_io=SodIO(use_numpy=True))
+        cold_ms, _ = time_ms(lambda: [cache.read_file(path) for path in file_paths], repeat=1)
+        warm_ms, _ = time_ms(lambda: [cache.read_file(path) for path in file_paths])
+    print(f"\ncache: cold {cold_ms:.2f} ms, warm {warm_ms:.2f} ms for {len(file_paths)} files")
+
+
+if __name__ == '__main__':
+    bench_mesh_decoding()
+    # e.g. python benchmark.py "D:\Program Files (x86)\Activision\Star Trek Armada II\SOD\8472_mother.sod"
+    for path in sys.argv[1:]:
+        bench_read_file(path)
+        bench_write(path)
+    if len(sys.argv) > 1:
+        bench_cache(sys.argv[1:])
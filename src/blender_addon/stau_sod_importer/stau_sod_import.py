@@ -70,6 +70,7 @@ class SodImporter:
         if sod.materials:
             mat_id = 0
             for material in sod.materials:
+                material = material.to_dict()  # plain copy, the importer adds its own keys
                 material['material_id'] = mat_id
                 material['diffuse_color'].append(1)  # add alpha
                 self.materials[material['name']] = material
@@ -101,6 +102,7 @@ class SodImporter:
 
         #     print('picked mesh with lod: ', curr_lod)
 
+        self.sod = sod
         self.nodes = sod.nodes
 
     def get_lod_from(self, mesh_node):
@@ -109,17 +111,7 @@ class SodImporter:
         return lod_from_node if lod_from_node < lod_from_parent else lod_from_parent
 
     def parse_lod_level(self, string):
-        if 'lod' in string:
-            lod = string[string.find('lod') + 3:].replace('_', '')
-            if lod is '':
-                return 0
-            try:
-                return int(lod)
-            except ValueError as e:
-                return 99
-        else:
-            # raise Exception('InvalidNodeTypeError')
-            return 99
+        return parse_lod_level(string)
 
     def create_mesh_object(self, parent_transform, mesh_node):
 
@@ -359,34 +351,22 @@ class SodImporter:
 
     def build_scene_tree(self):
         obj_tree = {}
-        scene_root_node = None
-        parent_transform = None
 
-        nodes_by_parent = {}
-        for node in self.nodes:
+        for root_node in self.sod.roots:  # Scene Root
+            parent_transform = root_node['local_transform']
+            root_obj = self.create_empty_object(root_node['type'] + "_" + root_node['id'], None, root_node['local_transform'], 'CUBE', 30)
+            obj_tree[root_node['id']] = root_obj
 
-            if node['parent'] == '':  # Scene Root
-                scene_root_node = node['id']
-                parent_transform = node['local_transform']
-                node_obj = self.create_empty_object(node['type'] + "_" + node['id'], None, node['local_transform'], 'CUBE', 30)
+            for node in self.sod.get_children(root_node['id']):
+                node_obj = self.create_empty_object(node['type'] + "_" + node['id'], parent_transform, node['local_transform'], 'PLAIN_AXES', 35)
+                node_obj.parent = root_obj
                 obj_tree[node['id']] = node_obj
-                continue
-
-            if node['parent'] not in nodes_by_parent.keys():
-                nodes_by_parent[node['parent']] = []
-
-            nodes_by_parent[node['parent']].append(node)
-
-        for node in nodes_by_parent[scene_root_node]:
-            node_obj = self.create_empty_object(node['type'] + "_" + node['id'], parent_transform, node['local_transform'], 'PLAIN_AXES', 35)
-            node_obj.parent = obj_tree[scene_root_node]
-            obj_tree[node['id']] = node_obj
-
-            if node['id'] in nodes_by_parent.keys():
-                self.build_hierarchy(node, nodes_by_parent, obj_tree)
+                self.build_hierarchy(node, obj_tree)
 
-    def build_hierarchy(self, parent_node, nodes_by_parent, obj_tree):
-        for node in nodes_by_parent[parent_node['id']]:
+    def build_hierarchy(self, parent_node, obj_tree):
+        for node in self.sod.get_children(parent_node['id']):
+            if node['id'] in obj_tree:
+                continue  # duplicate id or parent cycle
             child_obj = None
             if node['type'] == 'MESH':
                 child_obj = self.create_mesh_object(parent_node['local_transform'], node)
@@ -396,5 +376,4 @@ class SodImporter:
             child_obj.parent = obj_tree[parent_node['id']]
             obj_tree[node['id']] = child_obj
 
-            if node['id'] in nodes_by_parent.keys():
-                self.build_hierarchy(node, nodes_by_parent, obj_tree)
+            self.build_hierarchy(node, obj_tree)
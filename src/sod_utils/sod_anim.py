@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+# Evaluates the animation channels of SOD files
+__author__ = 'Elenterius'
+
+from .sod_io import Sod, compose_world_transforms
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional for sod_io, but required for sampling animations
+    np = None
+
+TRANSFORM_CHANNEL = 0  # keyframes are 3x4 local transforms
+SCALE_CHANNEL = 5  # keyframes are uniform scale factors
+
+
+def matrices_to_quaternions(matrices):
+    """converts (..., 3, 3) rotation matrices into (..., 4) unit quaternions (w, x, y, z)"""
+    m = matrices
+    m00, m01, m02 = m[..., 0, 0], m[..., 0, 1], m[..., 0, 2]
+    m10, m11, m12 = m[..., 1, 0], m[..., 1, 1], m[..., 1, 2]
+    m20, m21, m22 = m[..., 2, 0], m[..., 2, 1], m[..., 2, 2]
+
+    # compute all four candidates and keep the numerically most stable one (largest diagonal term)
+    traces = np.stack([1 + m00 + m11 + m22, 1 + m00 - m11 - m22, 1 - m00 + m11 - m22, 1 - m00 - m11 + m22], axis=-1)
+    s = np.sqrt(np.maximum(traces, 1e-12)) * 2  # 4 * the largest component
+    candidates = np.stack([
+        np.stack([s[..., 0] / 4, (m21 - m12) / s[..., 0], (m02 - m20) / s[..., 0], (m10 - m01) / s[..., 0]], axis=-1),
+        np.stack([(m21 - m12) / s[..., 1], s[..., 1] / 4, (m01 + m10) / s[..., 1], (m02 + m20) / s[..., 1]], axis=-1),
+        np.stack([(m02 - m20) / s[..., 2], (m01 + m10) / s[..., 2], s[..., 2] / 4, (m12 + m21) / s[..., 2]], axis=-1),
+        np.stack([(m10 - m01) / s[..., 3], (m02 + m20) / s[..., 3], (m12 + m21) / s[..., 3], s[..., 3] / 4], axis=-1),
+    ], axis=-2)
+    best = traces.argmax(axis=-1)[..., None, None]
+    quaternions = np.take_along_axis(candidates, best, axis=-2)[..., 0, :]
+    return quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+
+def quaternions_to_matrices(quaternions):
+    """converts (..., 4) unit quaternions (w, x, y, z) into (..., 3, 3) rotation matrices"""
+    w, x, y, z = np.moveaxis(quaternions, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=-1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def slerp(q0, q1, t):
+    """spherical linear interpolation of (..., 4) quaternions, t (...) in [0, 1]"""
+    dot = (q0 * q1).sum(axis=-1)
+    q1 = np.where(dot[..., None] < 0, -q1, q1)  # take the shorter arc
+    dot = np.abs(dot)
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    is_close = sin_theta < 1e-6  # nearly identical rotations, fall back to a normalized lerp
+    safe_sin = np.where(is_close, 1.0, sin_theta)
+    w0 = np.where(is_close, 1 - t, np.sin((1 - t) * theta) / safe_sin)
+    w1 = np.where(is_close, t, np.sin(t * theta) / safe_sin)
+
+    q = w0[..., None] * q0 + w1[..., None] * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def get_key_positions(times, periods, n_keys: int):
+    """
+    Returns the surrounding key indices and the blend factor for (T,) times and (C,) periods as (C, T) arrays.
+    Keys are evenly spaced over the period (key i at i * period / n_keys) and the channel loops,
+    so the last key blends back into the first one.
+    """
+    periods = periods[:, None]
+    safe_periods = np.where(periods > 0, periods, 1.0)
+    phase = np.mod(times[None, :], safe_periods) / safe_periods * n_keys
+    phase = np.where(periods > 0, phase, 0.0)  # channels without a period are constant
+    key0 = np.minimum(np.floor(phase).astype(np.intp), n_keys - 1)
+    return key0, (key0 + 1) % n_keys, phase - key0
+
+
+def prepare_transform_keys(keys):
+    """splits (C, K, 4, 3) transform keys into rotations (C, K, 4), axis lengths (C, K, 3) and positions (C, K, 3)"""
+    axes = keys[:, :, :3, :]
+    lengths = np.linalg.norm(axes, axis=-1)
+    rotations = axes / np.where(lengths > 0, lengths, 1.0)[..., None]
+    # mirrored axes can't be stored in a quaternion, flip the front axis and keep the sign in its length
+    signs = np.where(np.linalg.det(rotations) < 0, -1.0, 1.0)
+    rotations[:, :, 2, :] *= signs[..., None]
+    lengths[:, :, 2] *= signs
+    return matrices_to_quaternions(rotations), lengths, keys[:, :, 3, :]
+
+
+def interpolate_transform_keys(prepared_keys, periods, times):
+    """samples prepared transform keys of C channels at the (T,) times, returns (C, T, 4, 3) transforms"""
+    rotations, lengths, positions = prepared_keys
+    key0, key1, t = get_key_positions(times, periods, rotations.shape[1])
+    channels = np.arange(len(rotations))[:, None]
+    q = slerp(rotations[channels, key0], rotations[channels, key1], t)  # (C, T, 4)
+    t = t[..., None]
+    axis_lengths = lengths[channels, key0] * (1 - t) + lengths[channels, key1] * t
+    position = positions[channels, key0] * (1 - t) + positions[channels, key1] * t
+
+    transforms = np.empty(q.shape[:2] + (4, 3))
+    transforms[..., :3, :] = quaternions_to_matrices(q) * axis_lengths[..., None]
+    transforms[..., 3, :] = position
+    return transforms
+
+
+def interpolate_scale_keys(scales, periods, times):
+    """samples (C, K) scale keys at the (T,) times, returns (C, T) scales"""
+    key0, key1, t = get_key_positions(times, periods, scales.shape[1])
+    channels = np.arange(len(scales))[:, None]
+    return scales[channels, key0] * (1 - t) + scales[channels, key1] * t
+
+
+class AnimSampler:
+    """
+    Samples all animation channels of a sod at arbitrary times with a few batched numpy operations (requires numpy).
+
+    Transform channels replace the local transform of their node: the position and the axis lengths are interpolated
+    linearly, the rotation is interpolated with slerp. Scale channels scale the local axes of their node.
+    Channels with the same type and keyframe count are sampled together.
+    """
+
+    def __init__(self, sod: Sod):
+        if np is None:
+            raise ImportError('numpy is required for sampling animations')
+        self.sod = sod
+        self.local_transforms = np.array([node['local_transform'] for node in sod.nodes], dtype=np.float64).reshape(-1, 4, 3)
+        self.transform_groups = {}  # n_keys -> (node indices, periods, prepared keys, see prepare_transform_keys())
+        self.scale_groups = {}  # n_keys -> (node indices, periods, scales (C, K))
+
+        transform_channels = {}
+        scale_channels = {}
+        for channel in sod.animation_transforms or []:
+            n_keys = len(channel['keyframe_data']) if channel['keyframe_data'] is not None else 0
+            if sod.get_node(channel['node_ref']) is None or n_keys == 0:
+                print(f"Warning: {sod.name}: skipping animation channel of '{channel['node_ref']}'")
+                continue
+            node_index = sod.get_node_index(channel['node_ref'])
+            if channel['type'] == TRANSFORM_CHANNEL:
+                transform_channels.setdefault(n_keys, []).append((node_index, channel))
+            elif channel['type'] == SCALE_CHANNEL:
+                scale_channels.setdefault(n_keys, []).append((node_index, channel))
+
+        for n_keys, channels in transform_channels.items():
+            keys = np.array([channel['keyframe_data'] for _, channel in channels], dtype=np.float64).reshape(len(channels), n_keys, 4, 3)
+            self.transform_groups[n_keys] = (np.array([i for i, _ in channels], dtype=np.intp),
+                                             np.array([channel['period'] for _, channel in channels], dtype=np.float64),
+                                             prepare_transform_keys(keys))
+
+        for n_keys, channels in scale_channels.items():
+            self.scale_groups[n_keys] = (np.array([i for i, _ in channels], dtype=np.intp),
+                                         np.array([channel['period'] for _, channel in channels], dtype=np.float64),
+                                         np.array([channel['keyframe_data'] for _, channel in channels], dtype=np.float64).reshape(len(channels), n_keys))
+
+    def sample_local_transforms(self, times):
+        """returns the (T, N, 4, 3) local transforms of all nodes (in the order of sod.nodes) at the (T,) times"""
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        local = np.broadcast_to(self.local_transforms, (len(times),) + self.local_transforms.shape).copy()
+
+        for node_indices, periods, prepared_keys in self.transform_groups.values():
+            transforms = interpolate_transform_keys(prepared_keys, periods, times)  # (C, T, 4, 3)
+            local[:, node_indices] = np.swapaxes(transforms, 0, 1)
+
+        for node_indices, periods, scales in self.scale_groups.values():
+            scale = interpolate_scale_keys(scales, periods, times)  # (C, T)
+            local[:, node_indices, :3, :] *= np.swapaxes(scale, 0, 1)[..., None, None]
+
+        return local
+
+    def sample_world_transforms(self, times):
+        """returns the posed (T, N, 4, 3) world transforms of all nodes at the (T,) times"""
+        return compose_world_transforms(self.sample_local_transforms(times), self.sod.get_hierarchy_levels())
+
+
+def get_check_times(period: float, n_keys: int, subdivisions=4):
+    """every original key time and evenly spaced times in between, where the playback is compared"""
+    return np.arange(n_keys * subdivisions, dtype=np.float64) * (period / (n_keys * subdivisions))
+
+
+def compress_channel(channel, tolerance: float) -> int:
+    """
+    Replaces the keyframes of a channel with every n-th key if the playback stays within tolerance
+    (max. absolute difference of the interpolated matrix or scale values). Keys have to stay evenly spaced
+    over the period, so only divisors of the key count are possible, a single key is used for static channels.
+    The channel is modified in place, returns the new key count.
+    """
+    keyframe_data = channel['keyframe_data']
+    n_keys = len(keyframe_data) if keyframe_data is not None else 0
+    period = channel['period']
+    if n_keys <= 1 or channel['type'] not in (TRANSFORM_CHANNEL, SCALE_CHANNEL):
+        return n_keys
+    if period <= 0:
+        return n_keys  # the playback is pinned to the first key, the other keys can't be checked
+
+    periods = np.array([period], dtype=np.float64)
+    times = get_check_times(period, n_keys)
+    if channel['type'] == TRANSFORM_CHANNEL:
+        keys = np.array(keyframe_data, dtype=np.float64).reshape(1, n_keys, 4, 3)
+        interpolate = lambda keys_: interpolate_transform_keys(prepare_transform_keys(keys_), periods, times)
+    else:
+        keys = np.array(keyframe_data, dtype=np.float64).reshape(1, n_keys)
+        interpolate = lambda keys_: interpolate_scale_keys(keys_, periods, times)
+    reference = interpolate(keys)
+
+    for n in range(1, n_keys):
+        if n_keys % n != 0:
+            continue
+        step = n_keys // n
+        if np.abs(interpolate(keys[:, ::step]) - reference).max() <= tolerance:
+            channel['keyframe_data'] = keyframe_data[::step]
+            return n
+    return n_keys
+
+
+def compress_animations(sod: Sod, tolerance=1e-4) -> dict:
+    """
+    Compresses all animation channels of the sod in place, returns {node_ref: (old key count, new key count)}.
+    Run it before writing the sod, see compress_channel() for the tolerance.
+    """
+    if np is None:
+        raise ImportError('numpy is required for compressing animations')
+    report = {}
+    for channel in sod.animation_transforms or []:
+        n_keys = len(channel['keyframe_data']) if channel['keyframe_data'] is not None else 0
+        n_compressed = compress_channel(channel, tolerance)
+        report[channel['node_ref']] = (n_keys, n_compressed)
+        if n_compressed < n_keys:
+            print(f"compressed animation of '{channel['node_ref']}': {n_keys} -> {n_compressed} keys")
+    return report
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# On-disk cache for parsed SOD files
+__author__ = 'Elenterius'
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+from .sod_io import SodIO, Sod, __version__ as parser_version
+
+# version of the pickled model (Sod, Node, Mesh, ...), bump it whenever their attributes change,
+# otherwise entries written by an older model would be loaded into the new classes
+CACHE_FORMAT_VERSION = 2
+
+
+class SodCache:
+    """
+    Caches parsed Sod objects on disk as pickles (protocol 5, numpy arrays are stored as raw buffers).
+
+    Entries are keyed by absolute path, file size, mtime, parser version, cache format version and the SodIO options,
+    so a modified file or a model change never returns a stale result. Entries also store the cache format version,
+    entries of another version are discarded.
+    The cache is bounded by max_bytes, the least recently used entries are evicted first.
+    """
+
+    ENTRY_SUFFIX = '.sodcache'
+
+    def __init__(self, cache_dir: str, max_bytes=1024 * 1024 * 1024, sod_io: SodIO = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sod_io = sod_io if sod_io else SodIO()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_key(self, file_path) -> str:
+        stat = os.stat(file_path)
+        key = '|'.join([os.path.abspath(file_path), str(stat.st_size), str(stat.st_mtime_ns), parser_version, str(CACHE_FORMAT_VERSION),
+                        str(self.sod_io.use_numpy), str(self.sod_io.lazy_meshes), str(self.sod_io.lod)])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.ENTRY_SUFFIX)
+
+    def read_file(self, file_path) -> Sod:
+        """returns the cached sod if the file didn't change, otherwise the file is parsed and cached"""
+        entry_path = self.get_entry_path(self.get_key(file_path))
+
+        sod = self.load_entry(entry_path)
+        if sod is None:
+            sod = self.sod_io.read_file(file_path)
+            self.save_entry(entry_path, sod)
+            self.evict()
+        return sod
+
+    def load_entry(self, entry_path: str):
+        try:
+            with open(entry_path, 'rb') as file:
+                format_version, sod = pickle.load(file)
+            if format_version != CACHE_FORMAT_VERSION or not isinstance(sod, Sod):
+                raise ValueError(f'cache format version {format_version} != {CACHE_FORMAT_VERSION}')
+            missing = vars(Sod('')).keys() - vars(sod).keys()  # entries of an older model lack the newer attributes
+            if missing:
+                raise AttributeError(f"cached sod has no attribute(s) {', '.join(sorted(missing))}")
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # truncated or incompatible entry (e.g. AttributeError/ValueError of an older model)
+            print(f"Warning: discarding invalid cache entry {entry_path}: {e}")
+            self.remove_entry(entry_path)
+            return None
+
+        os.utime(entry_path)  # mark as recently used
+        return sod
+
+    def save_entry(self, entry_path: str, sod: Sod):
+        # write to a temporary file first, so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump((CACHE_FORMAT_VERSION, sod), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            self.remove_entry(tmp_path)
+            raise
+
+    @staticmethod
+    def remove_entry(entry_path: str):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+    def get_entries(self) -> list:
+        """returns (mtime, size, path) of all cache entries, least recently used first"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(self.ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed by another process
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self):
+        """removes the least recently used entries until the cache fits into max_bytes"""
+        entries = self.get_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove_entry(entry_path)
+            total -= size
+
+    def clear(self):
+        for _, _, entry_path in self.get_entries():
+            self.remove_entry(entry_path)
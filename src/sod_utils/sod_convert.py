@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# Re-targets SOD files to another sod version, e.g. Armada II (1.9x) models for Armada I (1.6 - 1.8)
+__author__ = 'Elenterius'
+
+import os
+import struct
+from functools import partial
+
+from .sod_io import SodIO, Sod, process_many
+
+SUPPORTED_VERSIONS = (1.6, 1.7, 1.8, 1.9, 1.91, 1.92, 1.93)
+
+
+def process_to_output_dir(process_file, input_dir, output_dir: str, file_path: str) -> str:
+    """
+    Runs process_file(file_path, output_path) for the mirrored output path and returns it, see SodConverter.get_output_path().
+    Batch jobs bind the first three arguments with functools.partial and pass it to process_many().
+    """
+    output_path = SodConverter.get_output_path(file_path, input_dir, output_dir)
+    process_file(file_path, output_path)
+    return output_path
+
+
+class SodConverter:
+    """
+    Converts sods to the target version by normalizing the version dependent fields:
+    legacy data (<= 1.8), material self illumination (> 1.8), texture material (> 1.6), bump map and borgification (> 1.91).
+
+    Fields that can't be stored in the target version are dropped with a warning,
+    missing fields are filled in with the defaults the parser uses for older versions.
+    """
+
+    def __init__(self, version: float, sod_io: SodIO = None):
+        if not any(abs(version - supported) < 0.0001 for supported in SUPPORTED_VERSIONS):
+            raise Exception('Unsupported SOD Version')
+        # store the float32 representation, the same value the parser reads from a file (e.g. 1.91 -> 1.9099999...)
+        self.version = struct.unpack(SodIO.FLOAT, struct.pack(SodIO.FLOAT, version))[0]
+        self.sod_io = sod_io if sod_io else SodIO()
+
+    def convert(self, sod: Sod) -> Sod:
+        """converts the sod in place and returns it"""
+        version = self.version
+        name = sod.name
+
+        if version <= 1.81:
+            if sod.unknown_legacy_data is None:
+                sod.set_legacy_data([])
+        elif sod.unknown_legacy_data:
+            print(f"Warning: {name}: dropping legacy data, not supported by sod version {version:.2f}")
+            sod.set_legacy_data(None)
+
+        for material in sod.materials:
+            if version <= 1.8001 and material['self_illumination_enabled']:
+                print(f"Warning: {name}: dropping self illumination of material '{material['name']}'")
+                material['self_illumination_enabled'] = False
+
+        for node in sod.meshes:
+            self.convert_mesh(node.id, node.data, name)
+
+        sod.set_version(version)
+        return sod
+
+    def convert_mesh(self, node_id: str, mesh, name: str):
+        """
+        Meshes without borgification get the borg texture the parser uses for an empty one ('<texture>_B').
+        The borg bump map (bump_map == 2) is kept if there is one, otherwise it is left empty (null string),
+        there is no bump texture to copy from older versions.
+        """
+        version = self.version
+
+        if version <= 1.61 and mesh['texture_material'] != 'default':
+            print(f"Warning: {name}: dropping texture material '{mesh['texture_material']}' of mesh '{node_id}'")
+            mesh['texture_material'] = 'default'
+
+        if version > 1.9101:
+            borg = mesh.get('borgification')
+            if borg is None:
+                # untextured meshes (texture is None) get an untextured borg texture as well
+                borg = mesh['borgification'] = {'texture': mesh['texture'] + '_B' if mesh['texture'] is not None else None}
+            if mesh['bump_map'] == 2:
+                borg.setdefault('bump_map', None)
+        else:
+            if mesh['bump_map'] != 0:
+                print(f"Warning: {name}: dropping bump map of mesh '{node_id}'")
+                mesh['bump_map'] = 0
+            mesh['borgification'] = None
+
+    def convert_file(self, file_path: str, output_path: str):
+        sod = self.convert(self.sod_io.read_file(file_path))
+        self.sod_io.write_file(sod, output_path)
+
+    @staticmethod
+    def get_output_path(file_path: str, input_dir, output_dir: str) -> str:
+        """mirrors the path relative to input_dir in output_dir, without input_dir the file is placed directly in output_dir"""
+        relative_path = os.path.relpath(file_path, input_dir) if input_dir else os.path.basename(file_path)
+        output_path = os.path.join(output_dir, relative_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        return output_path
+
+    def convert_many(self, file_paths, output_dir: str, input_dir=None, max_workers=None, chunksize=1, ordered=True):
+        """
+        Converts the files on a process pool and yields a (file_path, output_path, error) tuple per file.
+        Every worker reads, converts and writes one file at a time and only the paths are sent back,
+        at most two chunks per worker are in flight, so memory stays bounded regardless of the number of files.
+
+        :param input_dir: the directory structure below input_dir is mirrored in output_dir
+        :param max_workers: number of worker processes, defaults to the cpu count, 1 converts in this process
+        :param chunksize: number of files sent to a worker at once
+        :param ordered: yield the results in the order of file_paths instead of as soon as they are done
+        """
+        convert = partial(process_to_output_dir, self.convert_file, input_dir, output_dir)
+        return process_many(convert, file_paths, max_workers, chunksize, ordered)
+
+    def convert_directory(self, dir_path: str, output_dir: str, recursive=False, **kwargs):
+        """converts all .sod files in the directory, see convert_many() for the arguments and results"""
+        file_paths = SodIO.find_sod_files(dir_path, recursive)
+        return self.convert_many(file_paths, output_dir, input_dir=dir_path, **kwargs)
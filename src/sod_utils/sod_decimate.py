@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+# Mesh decimation (quadric error metric) and automatic LOD generation for SOD files
+__author__ = 'Elenterius'
+
+import copy
+import heapq
+from functools import partial
+
+from .sod_convert import process_to_output_dir
+from .sod_io import SodIO, Sod, Node, Mesh, VertexLightingGroup, NodeType, process_many
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional for sod_io, but required for decimation
+    np = None
+
+IDENTITY_TRANSFORM = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, 0.0]]
+MIN_NORMAL_DOT = 0.2  # rejects collapses that flip or fold over a face
+
+
+def compute_vertex_quadrics(positions, triangles):
+    """sums the area weighted plane quadrics (4x4) of the faces around each vertex"""
+    p0, p1, p2 = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    normals = np.cross(p1 - p0, p2 - p0)
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 1e-12
+    normals[valid] /= lengths[valid, None]
+    normals[~valid] = 0.0
+    planes = np.concatenate([normals, -(normals * p0).sum(axis=1, keepdims=True)], axis=1)
+    face_quadrics = (lengths * 0.5)[:, None, None] * planes[:, :, None] * planes[:, None, :]
+
+    quadrics = np.zeros((len(positions), 4, 4))
+    for k in range(3):
+        np.add.at(quadrics, triangles[:, k], face_quadrics)
+    return quadrics
+
+
+def face_normal(a, b, c):
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    return uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+
+
+def is_same_orientation(n0, n1) -> bool:
+    """True if the (unnormalized) normals point roughly into the same direction"""
+    dot = n0[0] * n1[0] + n0[1] * n1[1] + n0[2] * n1[2]
+    length_sq = (n0[0] ** 2 + n0[1] ** 2 + n0[2] ** 2) * (n1[0] ** 2 + n1[1] ** 2 + n1[2] ** 2)
+    return length_sq > 0.0 and dot > 0.0 and dot * dot >= MIN_NORMAL_DOT * MIN_NORMAL_DOT * length_sq
+
+
+class MeshDecimator:
+    """
+    Reduces the faces of a mesh with half edge collapses ordered by their quadric error (Garland & Heckbert).
+    A vertex is always collapsed into one of its neighbours, so the kept vertices and texture coordinates are a subset
+    of the original ones and no new uvs have to be interpolated.
+
+    UV seams are preserved: only vertices with a single texture coordinate are removed, and only if the faces
+    along the collapsed edge agree on the texture coordinate of the target vertex.
+    Boundary and non-manifold vertices are never removed, so holes and open edges keep their outline.
+    """
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.positions = np.asarray(mesh['vertices'], dtype=np.float64).reshape(-1, 3)
+        self.points = [tuple(p) for p in self.positions.tolist()]
+
+        self.faces = []  # [[v0, v1, v2], [t0, t1, t2], group index] per face, None once removed
+        for group_index, group in enumerate(mesh['vertex_lighting_groups']):
+            for face in group['faces']:
+                self.faces.append([[int(v) for v, _ in face], [int(t) for _, t in face], group_index])
+        self.n_faces = len(self.faces)
+
+        n_vertices = len(self.positions)
+        self.vertex_faces = [set() for _ in range(n_vertices)]
+        self.vertex_uvs = [set() for _ in range(n_vertices)]
+        edge_counts = {}
+        for i, (vertices, uvs, _) in enumerate(self.faces):
+            for k in range(3):
+                self.vertex_faces[vertices[k]].add(i)
+                self.vertex_uvs[vertices[k]].add(uvs[k])
+                edge = tuple(sorted((vertices[k], vertices[(k + 1) % 3])))
+                edge_counts[edge] = edge_counts.get(edge, 0) + 1
+
+        self.is_locked = [False] * n_vertices
+        for (a, b), count in edge_counts.items():
+            if count != 2:  # boundary or non-manifold edge
+                self.is_locked[a] = self.is_locked[b] = True
+
+        triangles = np.array([vertices for vertices, _, _ in self.faces], dtype=np.intp).reshape(-1, 3)
+        self.quadrics = compute_vertex_quadrics(self.positions, triangles)
+        self.versions = [0] * n_vertices
+        self.is_removed = [False] * n_vertices
+        self.heap = []
+        self.push_edges([edge for pair in edge_counts for edge in (pair, pair[::-1])])
+
+    def push_edges(self, edges: list):
+        """computes the costs of collapsing u into v for all (u, v) edges at once and pushes them onto the heap"""
+        edges = [(u, v) for u, v in edges if not self.is_locked[u] and len(self.vertex_uvs[u]) == 1]
+        if not edges:
+            return
+        sources, targets = np.array(edges, dtype=np.intp).T
+        h = np.concatenate([self.positions[targets], np.ones((len(targets), 1))], axis=1)
+        costs = np.einsum('ni,nij,nj->n', h, self.quadrics[sources] + self.quadrics[targets], h)
+        for cost, (u, v) in zip(costs.tolist(), edges):
+            heapq.heappush(self.heap, (cost, u, v, self.versions[u], self.versions[v]))
+
+    def get_neighbours(self, vertex: int) -> set:
+        return {w for i in self.vertex_faces[vertex] for w in self.faces[i][0]} - {vertex}
+
+    def try_collapse(self, u: int, v: int) -> bool:
+        shared_faces = self.vertex_faces[u] & self.vertex_faces[v]
+        if not shared_faces:
+            return False  # not connected anymore
+
+        # uv continuity, the remaining faces of u take over the uv that v has in the faces along the edge
+        target_uvs = {self.faces[i][1][self.faces[i][0].index(v)] for i in shared_faces}
+        if len(target_uvs) != 1:
+            return False
+        target_uv = target_uvs.pop()
+
+        # link condition, collapsing must not create non-manifold edges
+        opposite = {w for i in shared_faces for w in self.faces[i][0]} - {u, v}
+        if self.get_neighbours(u) & self.get_neighbours(v) != opposite:
+            return False
+
+        moved_faces = self.vertex_faces[u] - shared_faces
+        target = self.points[v]
+        for i in moved_faces:
+            vertices = self.faces[i][0]
+            old = [self.points[w] for w in vertices]
+            new = [target if w == u else self.points[w] for w in vertices]
+            if not is_same_orientation(face_normal(*old), face_normal(*new)):
+                return False
+
+        for i in shared_faces:
+            for w in self.faces[i][0]:
+                self.vertex_faces[w].discard(i)
+            self.faces[i] = None
+            self.n_faces -= 1
+        for i in moved_faces:
+            vertices, uvs, _ = self.faces[i]
+            k = vertices.index(u)
+            vertices[k] = v
+            uvs[k] = target_uv
+            self.vertex_faces[v].add(i)
+
+        self.vertex_faces[u].clear()
+        self.is_removed[u] = True
+        self.quadrics[v] += self.quadrics[u]
+        self.versions[v] += 1
+
+        neighbours = self.get_neighbours(v)
+        self.push_edges([(v, w) for w in neighbours] + [(w, v) for w in neighbours])
+        return True
+
+    def decimate(self, target_faces: int):
+        """collapses the cheapest edges until the mesh has at most target_faces faces or no valid collapse is left"""
+        while self.n_faces > target_faces and self.heap:
+            cost, u, v, version_u, version_v = heapq.heappop(self.heap)
+            if self.is_removed[u] or self.is_removed[v] or version_u != self.versions[u] or version_v != self.versions[v]:
+                continue  # outdated entry
+            self.try_collapse(u, v)
+
+    def build_mesh(self) -> Mesh:
+        """returns a new mesh with the remaining faces, unused vertices and texture coordinates are dropped"""
+        mesh = self.mesh
+        faces = [face for face in self.faces if face is not None]
+        used_vertices = sorted({v for vertices, _, _ in faces for v in vertices})
+        used_uvs = sorted({t for _, uvs, _ in faces for t in uvs})
+        vertex_map = {v: i for i, v in enumerate(used_vertices)}
+        uv_map = {t: i for i, t in enumerate(used_uvs)}
+
+        groups = [[] for _ in mesh['vertex_lighting_groups']]
+        for vertices, uvs, group_index in faces:
+            groups[group_index].append([[vertex_map[v], uv_map[t]] for v, t in zip(vertices, uvs)])
+
+        is_ndarray = isinstance(mesh['vertices'], np.ndarray)
+        if is_ndarray:
+            vertices = mesh['vertices'][np.array(used_vertices, dtype=np.intp)].reshape(-1, 3)
+            texture_coordinates = mesh['texture_coordinates'][np.array(used_uvs, dtype=np.intp)].reshape(-1, 2)
+            groups = [np.array(group_faces, dtype=np.uint16).reshape(-1, 3, 2) for group_faces in groups]
+        else:
+            vertices = [list(mesh['vertices'][v]) for v in used_vertices]
+            texture_coordinates = [list(mesh['texture_coordinates'][t]) for t in used_uvs]
+
+        lighting_groups = [VertexLightingGroup(group['lighting_material'], group_faces)
+                           for group, group_faces in zip(mesh['vertex_lighting_groups'], groups) if len(group_faces)]
+        return Mesh(mesh['texture_material'], mesh['bump_map'], mesh['texture'], copy.deepcopy(mesh.get('borgification')),
+                    vertices, texture_coordinates, lighting_groups, mesh['cull_type'])
+
+
+def count_faces(mesh) -> int:
+    return sum(len(group['faces']) for group in mesh['vertex_lighting_groups'])
+
+
+def decimate_mesh(mesh, ratio: float) -> Mesh:
+    """returns a decimated copy of the mesh with about ratio * faces faces (requires numpy)"""
+    if np is None:
+        raise ImportError('numpy is required for mesh decimation')
+    decimator = MeshDecimator(mesh)
+    decimator.decimate(int(count_faces(mesh) * ratio))
+    return decimator.build_mesh()
+
+
+class LodGenerator:
+    """
+    Adds decimated LODs to meshes that aren't part of a LOD yet.
+
+    The mesh node becomes a null node (same id, transform and children, so hardpoints and animations keep working)
+    with a LOD control child '<id>_lods', whose children are the LOD meshes '<id>_lod0' (the original mesh),
+    '<id>_lod1', ... which are ordered by their level like the LODs of the original models.
+    Meshes referenced by animated texture references are skipped, the reference needs the mesh node id.
+    """
+
+    def __init__(self, ratios=(0.5, 0.25), min_faces=200, sod_io: SodIO = None):
+        """
+        :param ratios: face count of each generated LOD relative to the original mesh
+        :param min_faces: meshes with fewer faces are left as they are
+        """
+        if np is None:
+            raise ImportError('numpy is required for mesh decimation')
+        self.ratios = ratios
+        self.min_faces = min_faces
+        self.sod_io = sod_io if sod_io else SodIO()
+
+    def get_candidates(self, sod: Sod) -> list:
+        referenced = {reference['node'] for reference in sod.animation_tex_refs or []}
+        candidates = []
+        for node in sod.meshes:
+            if node['id'] in referenced:
+                continue
+            if any(ancestor['type'] == NodeType.LOD_CONTROL.name for ancestor in sod.get_ancestors(node['id'])):
+                continue  # already a LOD
+            if count_faces(node['data']) >= self.min_faces:
+                candidates.append(node)
+        return candidates
+
+    def generate(self, sod: Sod) -> Sod:
+        """adds the LODs to the sod in place and returns it"""
+        candidates = {id(node) for node in self.get_candidates(sod)}
+        nodes = []
+        for node in sod.nodes:
+            if id(node) not in candidates:
+                nodes.append(node)
+                continue
+
+            node_id = node['id']
+            mesh = node['data']
+            lod_control_id = node_id + '_lods'
+            nodes.append(Node(NodeType.NULL_OR_HARDPOINT.name, node_id, node['parent'], node['local_transform'], None))
+            nodes.append(Node(NodeType.LOD_CONTROL.name, lod_control_id, node_id, copy.deepcopy(IDENTITY_TRANSFORM), None))
+            nodes.append(Node(NodeType.MESH.name, node_id + '_lod0', lod_control_id, copy.deepcopy(IDENTITY_TRANSFORM), mesh))
+
+            n_faces = count_faces(mesh)
+            for level, ratio in enumerate(self.ratios, start=1):
+                lod_mesh = decimate_mesh(mesh, ratio)
+                print(f"{sod.name}: '{node_id}' LOD {level} with {count_faces(lod_mesh)} of {n_faces} faces")
+                nodes.append(Node(NodeType.MESH.name, f'{node_id}_lod{level}', lod_control_id, copy.deepcopy(IDENTITY_TRANSFORM), lod_mesh))
+
+        sod.set_nodes(nodes)
+        return sod
+
+    def generate_file(self, file_path: str, output_path: str):
+        sod = self.generate(self.sod_io.read_file(file_path))
+        self.sod_io.write_file(sod, output_path)
+
+    def generate_many(self, file_paths, output_dir: str, input_dir=None, max_workers=None, chunksize=1, ordered=True):
+        """
+        Generates the LODs of the files on a process pool and yields a (file_path, output_path, error) tuple per file,
+        see SodConverter.convert_many() for the arguments
+        """
+        generate = partial(process_to_output_dir, self.generate_file, input_dir, output_dir)
+        return process_many(generate, file_paths, max_workers, chunksize, ordered)
+
+    def generate_directory(self, dir_path: str, output_dir: str, recursive=False, **kwargs):
+        """generates the LODs of all .sod files in the directory, see generate_many() for the arguments and results"""
+        file_paths = SodIO.find_sod_files(dir_path, recursive)
+        return self.generate_many(file_paths, output_dir, input_dir=dir_path, **kwargs)
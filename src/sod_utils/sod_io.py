@@ -9,11 +9,24 @@ __version__ = '1.4.1'
 #   Storm3D Object Definition (SOD) File Format (Version 1.8)
 #   Author: Steve Williams
 
+import glob
+import json
+import mmap
+import os
 import struct
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
 # uses tweaks from "Armada I/II SOD Importer V1.0.1 for 3dsMax" by Mr. Vulcan for reading SOD files with versions > 1.8
 from enum import IntEnum, Enum
+from functools import partial
+from itertools import chain
 from typing import BinaryIO, List
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, it's only required for array backed meshes and batched transforms
+    np = None
+
 
 class NodeType(Enum):
     NULL_OR_HARDPOINT = 0
@@ -39,7 +52,297 @@ class LightingModel(IntEnum):
         return NodeType.CONSTANT
 
 
+def _to_plain(value):
+    """converts records and numpy arrays into plain python dicts/lists (e.g. for json)"""
+    if isinstance(value, SodRecord):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: _to_plain(v) for key, v in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    if _is_ndarray(value):
+        return value.tolist()
+    return value
+
+
+def _is_ndarray(value) -> bool:
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def _equals(a, b) -> bool:
+    if _is_ndarray(a) or _is_ndarray(b):
+        return np.array_equal(a, b)
+    return a == b
+
+
+def compose_world_transforms(local_transforms, hierarchy_levels):
+    """
+    Composes local transforms (..., N, 4, 3) into world transforms, one batched matrix product per hierarchy level.
+    Transforms are row vectors (right, up, front, position), so world = local @ parent:
+    R_world = R_local @ R_parent and p_world = p_local @ R_parent + p_parent.
+    Leading dimensions are composed independently, e.g. (T, N, 4, 3) for T animation samples.
+
+    :param hierarchy_levels: (node_indices, parent_indices) per level below the roots, see Sod.get_hierarchy_levels()
+    """
+    world = np.array(local_transforms, dtype=np.float64)
+    for node_indices, parent_indices in hierarchy_levels:
+        parents = world[..., parent_indices, :, :]
+        world[..., node_indices, :, :] = world[..., node_indices, :, :] @ parents[..., :3, :]
+        world[..., node_indices, 3, :] += parents[..., 3, :]
+    return world
+
+
+def parse_lod_level(name: str) -> int:
+    """guesses the LOD level from a node name, e.g. 'lod1' -> 1, 'hull_lod_2' -> 2, 'lod' -> 0 and 99 if there is none"""
+    name = name.lower()
+    if 'lod' not in name:
+        return 99
+    lod = name[name.find('lod') + 3:].replace('_', '')
+    if lod == '':
+        return 0
+    try:
+        return int(lod)
+    except ValueError:
+        return 99
+
+
+def compute_bounds(vertices):
+    """
+    Returns the axis aligned bounding box and a bounding sphere of (N, 3) vertices (requires numpy)
+    as {'min', 'max', 'center', 'radius'}, the sphere is centered on the box. None if there are no vertices.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if len(vertices) == 0:
+        return None
+    min_ = vertices.min(axis=0)
+    max_ = vertices.max(axis=0)
+    center = (min_ + max_) * 0.5
+    radius = float(np.sqrt(((vertices - center) ** 2).sum(axis=1).max()))
+    return {'min': min_, 'max': max_, 'center': center, 'radius': radius}
+
+
+def merge_bounds(bounds_list):
+    """merges bounds into bounds enclosing all of them, the merged sphere is centered on the merged box"""
+    bounds_list = [bounds for bounds in bounds_list if bounds is not None]
+    if not bounds_list:
+        return None
+    min_ = np.min([bounds['min'] for bounds in bounds_list], axis=0)
+    max_ = np.max([bounds['max'] for bounds in bounds_list], axis=0)
+    center = (min_ + max_) * 0.5
+    radius = max(float(np.linalg.norm(bounds['center'] - center)) + bounds['radius'] for bounds in bounds_list)
+    return {'min': min_, 'max': max_, 'center': center, 'radius': radius}
+
+
+def build_mesh_buffers(mesh) -> dict:
+    """
+    Welds every unique (vertex, texture coordinate) pair of the faces into one interleaved vertex buffer (requires numpy).
+    Returns:
+      'vertices': (V, 5) float32 x, y, z, u, v in order of first use
+      'indices': (3 * F,) uint16 triangle list, uint32 if there are more than 65536 vertices
+      'draw_ranges': [{'lighting_material', 'start', 'count'}] per vertex lighting group, in indices
+      'source_indices': (V, 2) the welded (vertex index, texture coordinate index) pairs
+    """
+    positions = np.asarray(mesh['vertices'], dtype=np.float32).reshape(-1, 3)
+    uvs = np.asarray(mesh['texture_coordinates'], dtype=np.float32).reshape(-1, 2)
+
+    groups = mesh['vertex_lighting_groups']
+    corners = [np.asarray(group['faces'], dtype=np.int64).reshape(-1, 2) for group in groups]
+    corners = np.concatenate(corners) if corners else np.empty((0, 2), dtype=np.int64)
+    if len(corners) and (corners[:, 0].max() >= len(positions) or corners[:, 1].max() >= len(uvs)):
+        raise Exception('Face references a vertex or texture coordinate that does not exist')
+
+    # pack each pair into one key, dedup all of them at once and renumber the unique pairs by their first use
+    keys = corners[:, 0] * max(len(uvs), 1) + corners[:, 1]
+    _, first_use, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_use)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    source_indices = corners[first_use[order]]
+
+    vertices = np.empty((len(source_indices), 5), dtype=np.float32)
+    vertices[:, :3] = positions[source_indices[:, 0]]
+    vertices[:, 3:] = uvs[source_indices[:, 1]]
+
+    index_type = np.uint16 if len(vertices) <= 65536 else np.uint32
+    indices = rank[inverse.reshape(-1)].astype(index_type)
+
+    draw_ranges = []
+    start = 0
+    for group, group_corners in zip(groups, np.cumsum([len(group['faces']) * 3 for group in groups])):
+        draw_ranges.append({'lighting_material': group['lighting_material'], 'start': start, 'count': int(group_corners) - start})
+        start = int(group_corners)
+
+    return {'vertices': vertices, 'indices': indices, 'draw_ranges': draw_ranges, 'source_indices': source_indices}
+
+
+class SodRecord:
+    """
+    Base of the compact model classes, their fields are stored in __slots__ instead of a per object dict.
+    For backwards compatibility the fields can also be accessed like the dicts that were used before,
+    e.g. node['data'] or mesh['vertices']. Optional fields that are None count as missing keys.
+    """
+    __slots__ = ()
+    _fields = ()
+    _optional_fields = ()
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(f"{self.__class__.__name__} has no field '{key}'")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        if key in self._optional_fields:
+            return getattr(self, key) is not None
+        return key in self._fields
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return [key for key in self._fields if key in self]
+
+    def to_dict(self) -> dict:
+        """converts the record (including nested records and numpy arrays) into a json compatible dict"""
+        return {key: _to_plain(getattr(self, key)) for key in self.keys()}
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        return cls(**{key: dict_[key] for key in cls._fields if key in dict_})
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(_equals(getattr(self, key), getattr(other, key)) for key in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{key}={getattr(self, key)!r}' for key in self.keys())
+        return f'{self.__class__.__name__}({fields})'
+
+
+class Material(SodRecord):
+    __slots__ = _fields = ('name', 'ambient_color', 'diffuse_color', 'specular_color', 'specular_shininess', 'lighting_model', 'self_illumination_enabled')
+
+    def __init__(self, name, ambient_color, diffuse_color, specular_color, specular_shininess, lighting_model=LightingModel.CONSTANT, self_illumination_enabled=False):
+        self.name = name
+        self.ambient_color = ambient_color
+        self.diffuse_color = diffuse_color
+        self.specular_color = specular_color
+        self.specular_shininess = specular_shininess
+        self.lighting_model = lighting_model
+        self.self_illumination_enabled = self_illumination_enabled
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        material = super().from_dict(dict_)
+        material.lighting_model = LightingModel(material.lighting_model)
+        return material
+
+
+class VertexLightingGroup(SodRecord):
+    __slots__ = _fields = ('lighting_material', 'faces')
+
+    def __init__(self, lighting_material, faces):
+        self.lighting_material = lighting_material  # None -> default
+        self.faces = faces  # [[index_vertices, index_texture_cords] * 3] per face
+
+
+class Mesh(SodRecord):
+    __slots__ = _fields = ('texture_material', 'bump_map', 'texture', 'borgification', 'vertices', 'texture_coordinates', 'vertex_lighting_groups', 'cull_type')
+    _optional_fields = ('borgification',)
+
+    def __init__(self, texture_material='default', bump_map=0, texture=None, borgification=None, vertices=None, texture_coordinates=None, vertex_lighting_groups=None, cull_type='NO_CULL'):
+        self.texture_material = texture_material
+        self.bump_map = bump_map
+        self.texture = texture
+        self.borgification = borgification  # only present in sod versions > 1.91
+        self.vertices = vertices if vertices is not None else []
+        self.texture_coordinates = texture_coordinates if texture_coordinates is not None else []
+        self.vertex_lighting_groups = vertex_lighting_groups if vertex_lighting_groups is not None else []
+        self.cull_type = cull_type
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        mesh = super().from_dict(dict_)
+        mesh.vertex_lighting_groups = [group if isinstance(group, VertexLightingGroup) else VertexLightingGroup.from_dict(group) for group in mesh.vertex_lighting_groups]
+        return mesh
+
+
+class Node(SodRecord):
+    """
+    A node of the sod hierarchy. The data of lazily read mesh nodes is decoded from the raw mesh bytes
+    the first time it's accessed.
+    """
+    __slots__ = ('type', 'id', 'parent', 'local_transform', '_data', '_loader')
+    _fields = ('type', 'id', 'parent', 'local_transform', 'data')
+
+    def __init__(self, type, id, parent, local_transform, data=None):
+        self.type = type  # NodeType name
+        self.id = id
+        self.parent = parent
+        self.local_transform = local_transform  # right, up, front, position
+        self._data = data
+        self._loader = None
+
+    @classmethod
+    def lazy(cls, type, id, parent, local_transform, decode, raw_bytes: bytes):
+        node = cls(type, id, parent, local_transform)
+        node._loader = (decode, raw_bytes)
+        return node
+
+    @property
+    def loaded(self) -> bool:
+        return self._loader is None
+
+    @property
+    def data(self):
+        if self._loader is not None:
+            decode, raw_bytes = self._loader
+            self._data = decode(raw_bytes)
+            self._loader = None
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._loader = None
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        node = super().from_dict(dict_)
+        if node.type == NodeType.MESH.name and isinstance(node.data, dict):
+            node.data = Mesh.from_dict(node.data)
+        return node
+
+
+class AnimChannel(SodRecord):
+    __slots__ = _fields = ('node_ref', 'period', 'type', 'keyframe_data')
+
+    def __init__(self, node_ref, period, type, keyframe_data):
+        self.node_ref = node_ref  # node to which this animation channel refers
+        self.period = period  # length of time one loop of this channel lasts
+        self.type = type  # 0 -> position, 5 -> scale
+        self.keyframe_data = keyframe_data  # matrix34 (type 0) or float (type 5) per keyframe, evenly spaced over the period
+
+
+class AnimReference(SodRecord):
+    __slots__ = _fields = ('type', 'node', 'anim', 'playback_offset')
+
+    def __init__(self, type, node, anim, playback_offset):
+        self.type = type  # must be 4
+        self.node = node  # node to which this animation applies
+        self.anim = anim  # animation (as defined in .spr files) that is to be applied to this node
+        self.playback_offset = playback_offset  # time offset in seconds
+
+
 class Sod:
+    # note: Sod objects are pickled by SodCache, bump sod_cache.CACHE_FORMAT_VERSION when adding or renaming attributes
     def __init__(self, file_name, version=1.93):
         self._file_name = file_name
         self._version = version
@@ -53,6 +356,15 @@ class Sod:
         self._damage = None
         self._geometry = None
         self._lights = None
+        self._nodes_by_id = {}
+        self._node_positions = {}
+        self._children = {}
+        self._depths = {}
+        self._topological_order = []
+        self._hierarchy_levels = None
+        self._world_transforms = None
+        self._bounds = {}
+        self._mesh_buffers = {}
 
     def set_name(self, name: str):
         self._file_name = name
@@ -77,6 +389,11 @@ class Sod:
 
     def set_nodes(self, nodes: List):
         self._nodes = nodes
+        self.build_hierarchy_index()
+        self._hierarchy_levels = None
+        self._world_transforms = None
+        self._bounds = {}
+        self._mesh_buffers = {}
 
         self._meshes = list()
 
@@ -84,21 +401,198 @@ class Sod:
         self._damage = list()
         self._geometry = list()
         self._lights = list()
+        groups = {'hardpoints': self._hardpoints, 'damage': self._damage, 'geometry': self._geometry, 'lights': self._lights}
+
+        # a node belongs to the group of its nearest 'hardpoints', 'damage', 'geometry' or 'lights' ancestor
+        group_ids = {}
+        for node in self._topological_order:
+            parent = node['parent']
+            group_id = parent.lower() if parent.lower() in groups else group_ids.get(parent)
+            group_ids.setdefault(node['id'], group_id)
+
+            if node['type'] == NodeType.MESH.name:
+                continue
+            if group_id is not None:
+                groups[group_id].append(node)
 
         for node in nodes:
             if node['type'] == NodeType.MESH.name:
                 self._meshes.append(node)
+
+    def build_hierarchy_index(self):
+        """indexes the nodes by id and parent, and computes their depth and a topological (parents first) order"""
+        self._nodes_by_id = {}
+        self._node_positions = {}  # node id -> index in nodes
+        self._children = {}
+        for i, node in enumerate(self._nodes):
+            if node['id'] not in self._nodes_by_id:  # the first node wins for duplicate ids
+                self._nodes_by_id[node['id']] = node
+                self._node_positions[node['id']] = i
+            self._children.setdefault(node['parent'], []).append(node)
+
+        # level by level, starting with the scene root and nodes whose parent doesn't exist
+        roots = [node for node in self._nodes if node['parent'] == '' or node['parent'] not in self._nodes_by_id]
+        self._depths = {}
+        self._topological_order = []
+        level = roots
+        depth = 0
+        while level:
+            next_level = []
+            for node in level:
+                if node['id'] in self._depths:
+                    continue  # duplicate id
+                self._depths[node['id']] = depth
+                self._topological_order.append(node)
+                next_level.extend(self._children.get(node['id'], ()))
+            level = next_level
+            depth += 1
+
+        if len(self._topological_order) < len(self._nodes):
+            visited = set(map(id, self._topological_order))
+            unreachable = [node for node in self._nodes if id(node) not in visited]
+            print(f"Warning: {len(unreachable)} nodes are part of a parent cycle or have duplicate ids")
+            for node in unreachable:
+                self._depths.setdefault(node['id'], 0)
+                self._topological_order.append(node)
+
+    def get_node(self, node_id: str):
+        """returns the node with the given id or None"""
+        return self._nodes_by_id.get(node_id)
+
+    def get_node_index(self, node_id: str) -> int:
+        """returns the position of the node in sod.nodes, e.g. for the arrays of world_transforms()"""
+        return self._node_positions[node_id]
+
+    def get_children(self, node_id: str) -> list:
+        return self._children.get(node_id, [])
+
+    def get_parent(self, node_id: str):
+        node = self._nodes_by_id.get(node_id)
+        return self._nodes_by_id.get(node['parent']) if node is not None else None
+
+    def get_depth(self, node_id: str) -> int:
+        """distance to the root, the scene root has depth 0"""
+        return self._depths[node_id]
+
+    def iter_descendants(self, node_id: str):
+        """yields all nodes below the node, parents before their children"""
+        stack = list(reversed(self.get_children(node_id)))
+        visited = set()
+        while stack:
+            node = stack.pop()
+            if node['id'] in visited:
                 continue
+            visited.add(node['id'])
+            yield node
+            stack.extend(reversed(self.get_children(node['id'])))
+
+    def get_ancestors(self, node_id: str) -> list:
+        """returns the parent, grandparent, ... up to the root"""
+        ancestors = []
+        visited = {node_id}
+        parent = self.get_parent(node_id)
+        while parent is not None and parent['id'] not in visited:
+            ancestors.append(parent)
+            visited.add(parent['id'])
+            parent = self.get_parent(parent['id'])
+        return ancestors
+
+    @property
+    def roots(self) -> list:
+        return [node for node in self._topological_order if self._depths.get(node['id']) == 0]
 
-            parent = node["parent"].lower()
-            if parent == "hardpoints":
-                self._hardpoints.append(node)
-            elif parent == "damage":
-                self._damage.append(node)
-            elif parent == "geometry":
-                self._geometry.append(node)
-            elif parent == "lights":
-                self._lights.append(node)
+    @property
+    def topological_order(self) -> list:
+        """all nodes ordered level by level, every node comes after its parent"""
+        return self._topological_order
+
+    def get_hierarchy_levels(self) -> list:
+        """
+        Returns (node_indices, parent_indices) arrays per hierarchy level below the roots,
+        indices refer to positions in sod.nodes (requires numpy)
+        """
+        if self._hierarchy_levels is None:
+            positions = {id(node): i for i, node in enumerate(self._nodes)}
+            levels = {}  # position -> level
+            by_level = {}
+            for node in self._topological_order:
+                i = positions[id(node)]
+                parent = self._nodes_by_id.get(node['parent'])
+                parent_i = positions[id(parent)] if parent is not None else None
+                if parent_i is None or parent_i not in levels:  # root or part of a parent cycle
+                    levels[i] = 0
+                    continue
+                levels[i] = levels[parent_i] + 1
+                by_level.setdefault(levels[i], []).append((i, parent_i))
+
+            self._hierarchy_levels = []
+            for level in sorted(by_level):
+                node_indices, parent_indices = zip(*by_level[level])
+                self._hierarchy_levels.append((np.array(node_indices, dtype=np.intp), np.array(parent_indices, dtype=np.intp)))
+        return self._hierarchy_levels
+
+    def world_transforms(self):
+        """
+        Returns the world transforms of all nodes as a read only (N, 4, 3) float64 array in the order of sod.nodes (requires numpy).
+        The result is cached until set_nodes() is called, call it again after modifying local transforms in place.
+        """
+        if self._world_transforms is None:
+            if np is None:
+                raise ImportError('numpy is required for batched world transforms')
+            local_transforms = np.array([node['local_transform'] for node in self._nodes], dtype=np.float64).reshape(-1, 4, 3)
+            self._world_transforms = compose_world_transforms(local_transforms, self.get_hierarchy_levels())
+            self._world_transforms.flags.writeable = False
+        return self._world_transforms
+
+    def get_world_transform(self, node_id: str):
+        """returns the (4, 3) world transform of the node"""
+        return self.world_transforms()[self._node_positions[node_id]]
+
+    def get_mesh_bounds(self, node_id: str, world=False):
+        """
+        Returns the bounding box and sphere of a mesh node in local or world space (requires numpy), see compute_bounds().
+        Results are cached until set_nodes() is called.
+        """
+        key = (node_id, world)
+        if key not in self._bounds:
+            vertices = self._nodes_by_id[node_id]['data']['vertices']
+            if world and len(vertices) > 0:
+                transform = self.get_world_transform(node_id)
+                vertices = np.asarray(vertices, dtype=np.float64) @ transform[:3] + transform[3]
+            self._bounds[key] = compute_bounds(vertices)
+        return self._bounds[key]
+
+    def get_subtree_bounds(self, node_id: str):
+        """returns the world space bounds of all meshes in the subtree of the node (including the node itself)"""
+        key = (node_id, 'subtree')
+        if key not in self._bounds:
+            nodes = chain([self._nodes_by_id[node_id]], self.iter_descendants(node_id))
+            self._bounds[key] = merge_bounds([self.get_mesh_bounds(node['id'], world=True)
+                                              for node in nodes if node['type'] == NodeType.MESH.name])
+        return self._bounds[key]
+
+    def get_lod_bounds(self) -> dict:
+        """returns the world space bounds of every LOD (child of a LOD control node): {lod_control_id: {lod_id: bounds}}"""
+        return {node['id']: {lod['id']: self.get_subtree_bounds(lod['id']) for lod in self.get_children(node['id'])}
+                for node in self._nodes if node['type'] == NodeType.LOD_CONTROL.name}
+
+    @property
+    def bounds(self):
+        """world space bounds of all meshes of the model"""
+        if 'model' not in self._bounds:
+            self._bounds['model'] = merge_bounds([self.get_mesh_bounds(node['id'], world=True) for node in self._meshes])
+        return self._bounds['model']
+
+    def get_mesh_buffers(self, node_id: str) -> dict:
+        """returns the welded vertex/index buffers of a mesh node, see build_mesh_buffers(), cached until set_nodes() is called"""
+        if node_id not in self._mesh_buffers:
+            self._mesh_buffers[node_id] = build_mesh_buffers(self._nodes_by_id[node_id]['data'])
+        return self._mesh_buffers[node_id]
+
+    def clear_mesh_caches(self):
+        """drops the cached bounds and mesh buffers, has to be called after the mesh data was modified in place"""
+        self._bounds = {}
+        self._mesh_buffers = {}
 
     @property
     def nodes(self):
@@ -126,10 +620,10 @@ class Sod:
         dict_ = {
             'file_name': self._file_name,
             'version': self._version,
-            'materials': self._materials,
-            'nodes': self._nodes,
-            'anim_transforms': self._animation_transforms,
-            'anim_textures': self._animation_tex_refs
+            'materials': _to_plain(self._materials),
+            'nodes': _to_plain(self._nodes),
+            'anim_transforms': _to_plain(self._animation_transforms),
+            'anim_textures': _to_plain(self._animation_tex_refs)
         }
         if self._version <= 1.81:
             dict_["unknown_legacy_data"] = self._unknown_legacy_data
@@ -159,6 +653,164 @@ class Sod:
         return self._lights
 
 
+class SodReader:
+    """
+    Binary reader over an in-memory buffer (bytes, bytearray, memoryview or mmap).
+
+    Mimics the read/seek/tell interface of a binary file, but read() returns memoryview slices
+    into the buffer, so decoding works with offsets instead of copying stream reads.
+
+    The reader is the per-call parse context: it carries the sod version of the data being read,
+    so a single SodIO instance can be shared by concurrent parses.
+    """
+
+    SEARCH_CHUNK_SIZE = 1 << 20  # bytes
+
+    def __init__(self, buffer, version: float = None):
+        self._buffer = buffer
+        self._view = memoryview(buffer).cast('B')
+        self._offset = 0
+        self.version = version
+
+    @property
+    def size(self) -> int:
+        return self._view.nbytes
+
+    def read(self, size=-1) -> memoryview:
+        start = self._offset
+        end = self._view.nbytes if size is None or size < 0 else min(start + size, self._view.nbytes)
+        self._offset = end
+        return self._view[start:end]
+
+    def seek(self, offset: int, whence=0) -> int:
+        if whence == 1:
+            offset += self._offset
+        elif whence == 2:
+            offset += self._view.nbytes
+        self._offset = max(offset, 0)
+        return self._offset
+
+    def tell(self) -> int:
+        return self._offset
+
+    def find(self, sub: bytes, start=0, end=None) -> int:
+        """returns the lowest offset of sub within buffer[start:end] or -1"""
+        end = self._view.nbytes if end is None else min(end, self._view.nbytes)
+        if hasattr(self._buffer, 'find'):  # bytes, bytearray, mmap
+            return self._buffer.find(sub, start, end)
+
+        # memoryview has no find(), search in chunks that overlap by len(sub) - 1 bytes
+        for offset in range(start, end, self.SEARCH_CHUNK_SIZE):
+            index = bytes(self._view[offset:min(offset + self.SEARCH_CHUNK_SIZE + len(sub) - 1, end)]).find(sub)
+            if index >= 0:
+                return offset + index
+        return -1
+
+    def release(self):
+        self._view.release()
+
+
+class SodWriter:
+    """
+    Binary writer that assembles the whole output in a pre-sized bytearray with struct.pack_into,
+    the result is flushed with a single write.
+
+    The writer is the per-call write context: it carries the targeted sod version.
+    """
+
+    def __init__(self, version: float, capacity=4096):
+        self._buffer = bytearray(max(capacity, 16))
+        self._offset = 0
+        self.version = version
+
+    def _reserve(self, size: int):
+        required = self._offset + size
+        if required > len(self._buffer):  # the size estimate was too small, grow by doubling
+            self._buffer.extend(bytes(max(required, 2 * len(self._buffer)) - len(self._buffer)))
+
+    def pack(self, format_, *values):
+        """packs the values with a struct.Struct or format string at the current offset"""
+        struct_ = format_ if isinstance(format_, struct.Struct) else struct.Struct(format_)
+        self._reserve(struct_.size)
+        struct_.pack_into(self._buffer, self._offset, *values)
+        self._offset += struct_.size
+
+    def write(self, bytes_) -> int:
+        size = memoryview(bytes_).nbytes
+        self._reserve(size)
+        self._buffer[self._offset:self._offset + size] = bytes_
+        self._offset += size
+        return size
+
+    def tell(self) -> int:
+        return self._offset
+
+    def getbuffer(self) -> memoryview:
+        """returns a view of the written bytes"""
+        return memoryview(self._buffer)[:self._offset]
+
+
+def _process_files(func, file_paths: list) -> list:
+    """runs func(file_path) for a chunk of files in a worker process, errors are returned per file instead of being raised"""
+    results = []
+    for file_path in file_paths:
+        try:
+            results.append((file_path, func(file_path), None))
+        except Exception as e:
+            results.append((file_path, None, e))
+    return results
+
+
+def process_many(func, file_paths, max_workers=None, chunksize=1, ordered=True):
+    """
+    Runs func(file_path) for every file on a process pool and yields a (file_path, result, error) tuple per file.
+    The files are sent to the workers in chunks of chunksize files, func has to be picklable (e.g. a bound method
+    or a functools.partial of a module level function). At most two chunks per worker are in flight,
+    so results don't pile up while the consumer is busy.
+    """
+    if chunksize < 1:
+        raise ValueError(f'chunksize must be at least 1, got {chunksize}')
+    file_paths = list(file_paths)
+    chunks = (file_paths[i:i + chunksize] for i in range(0, len(file_paths), chunksize))
+    return _iter_chunk_results(func, chunks, max_workers, ordered)
+
+
+def _iter_chunk_results(func, chunks, max_workers, ordered):
+    chunks = iter(chunks)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1:  # no need for a pool, e.g. when debugging or inside blender
+        for chunk in chunks:
+            yield from _process_files(func, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}  # future -> chunk, insertion ordered
+
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending[executor.submit(_process_files, func, chunk)] = chunk
+
+        for i in range(max_workers * 2):
+            submit_next()
+
+        while pending:
+            if ordered:
+                future = next(iter(pending))
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = next(iter(done))
+
+            chunk = pending.pop(future)
+            submit_next()
+            try:
+                yield from future.result()
+            except Exception as e:  # the worker itself failed (e.g. a broken pool), report it for every file of the chunk
+                for file_path in chunk:
+                    yield file_path, None, e
+
+
 class SodIO:
     # data types in little-endian byte order
     UINT8 = '<B'  # unsigned char (1 byte)
@@ -173,73 +825,397 @@ class SodIO:
     FLOAT = '<f'  # float (4 bytes)
     FLOAT_BYTE_SIZE = struct.calcsize(FLOAT)
 
+    UINT8_STRUCT = struct.Struct(UINT8)
+    UINT16_STRUCT = struct.Struct(UINT16)
+    UINT32_STRUCT = struct.Struct(UINT32)
+    FLOAT_STRUCT = struct.Struct(FLOAT)
+
+    # precompiled structs for decoding whole blocks at once
+    VECTOR2_STRUCT = struct.Struct('<2f')  # u, v
+    VECTOR3_STRUCT = struct.Struct('<3f')  # x, y, z
+    MATRIX34_STRUCT = struct.Struct('<12f')  # right, up, front, position
+    FACE_STRUCT = struct.Struct('<6H')  # 3 face vertices: index_vertices, index_texture_cords
+    FACE_VERTEX_STRUCT = struct.Struct('<2H')  # index_vertices, index_texture_cords
+
     MAGIC_STRING = b'Storm3D_SW'  # SOD signature
     MAGIC_STRING_SIZE = 10  # magic string size in bytes
+    DATABASE_MAGIC_STRING = b'StarTrekDB'  # signature of the game's database files
+
+    INDEX_SIDECAR_SUFFIX = '.idx'  # node offset index saved next to the sod file
+    INDEX_FORMAT_VERSION = 2
 
     DEFAULT_SOD_VERSION = struct.unpack(FLOAT, struct.pack(FLOAT, 1.93))[0]
 
-    def __init__(self):
-        self.curr_sod_version = 0.0
+    def __init__(self, use_numpy=False, lazy_meshes=False, lod=None):
+        """
+        :param use_numpy: decode mesh vertices (N,3), texture coordinates (M,2) and faces (F,3,2) into numpy arrays
+        (float32/uint16) instead of lists of python floats and ints
+        :param lazy_meshes: skip the mesh payloads while reading the nodes and decode them when node.data
+        is accessed the first time
+        :param lod: only read one LOD of every LOD control node, the nodes of the other LODs are skipped.
+        The LODs are ordered by the level in their name (lod0, lod1, ...), 0 or 'highest' selects the most detailed one,
+        'lowest' the least detailed one, indices past the last LOD select the last one.
+        Animation channels and texture references of the skipped nodes are dropped as well
+        """
+        if use_numpy and np is None:
+            raise ImportError('numpy is required for array backed meshes')
+        if lod is not None and lod not in ('highest', 'lowest') and not (isinstance(lod, int) and not isinstance(lod, bool) and lod >= 0):
+            raise ValueError(f"invalid LOD selection {lod!r}, expected an index, 'highest' or 'lowest'")
+        self.use_numpy = use_numpy
+        self.lazy_meshes = lazy_meshes
+        self.lod = lod
 
     def read_file(self, file_path) -> Sod:
-        return self.__parse_sod(file_path)
+        """memory maps the file and parses it without intermediate copies"""
+        with self.map_file(file_path) as buffer:
+            return self.read_buffer(buffer, file_path.split("\\")[-1])
+
+    @staticmethod
+    @contextmanager
+    def map_file(file_path):
+        """memory maps the file for reading, yields an empty buffer for empty files (they can't be mapped)"""
+        with open(file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield b''
+                return
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            yield buffer
+        finally:
+            try:
+                buffer.close()
+            except BufferError:
+                pass  # slices are still referenced (e.g. by a traceback), the map is closed once they are released
+
+    def iter_nodes(self, file_path):
+        """
+        Yields ('node', node) for every node as soon as it's decoded, followed by ('anim_transform', channel)
+        and ('anim_tex_ref', reference) tuples. No Sod object is built, so filtering or converting nodes
+        runs in constant memory. Combine with lazy_meshes=True to skip decoding meshes that aren't needed.
+        """
+        with self.map_file(file_path) as buffer:
+            binary_io = SodReader(buffer)
+            try:
+                version = self.read_header(binary_io)
+                if version <= 1.81:
+                    self.read_unknown_legacy_data(binary_io)
+                self.read_lighting_materials(binary_io)
+
+                n_nodes = self.read_uint16(binary_io)
+                for i in range(n_nodes):
+                    yield 'node', self.read_single_node(binary_io)
+
+                n_channels = self.read_uint16(binary_io)
+                for i in range(n_channels):
+                    yield 'anim_transform', self.read_anim_channel(binary_io)
+
+                n_references = self.read_uint16(binary_io)
+                for i in range(n_references):
+                    yield 'anim_tex_ref', self.read_anim_reference(binary_io)
+            finally:
+                binary_io.release()
+
+    def build_index(self, file_path) -> dict:
+        """
+        Builds a table of contents of the file with the byte offset and length of every node, animation channel
+        and texture reference. Mesh and keyframe payloads are skipped over instead of being decoded.
+        """
+        stat = os.stat(file_path)
+        with self.map_file(file_path) as buffer:
+            binary_io = SodReader(buffer)
+            try:
+                version = self.read_header(binary_io)
+                if version <= 1.81:
+                    self.read_unknown_legacy_data(binary_io)
+
+                materials = []
+                n_materials = self.read_uint16(binary_io)
+                for i in range(n_materials):
+                    offset = binary_io.tell()
+                    name = self.read_string(binary_io)
+                    colors_offset = binary_io.tell()
+                    binary_io.seek(offset)
+                    self.read_lighting_material(binary_io)
+                    materials.append({'name': name, 'offset': offset, 'length': binary_io.tell() - offset, 'colors_offset': colors_offset})
+
+                nodes = []
+                n_nodes = self.read_uint16(binary_io)
+                for i in range(n_nodes):
+                    offset = binary_io.tell()
+                    node_type, node = self.read_node_header(binary_io)
+                    node['transform_offset'] = binary_io.tell()
+                    binary_io.seek(self.MATRIX34_STRUCT.size, 1)  # local transform
+                    if node_type is NodeType.MESH:
+                        self.skip_mesh_node(binary_io)
+                    else:
+                        self.read_typed_node(node_type, binary_io)
+                    node['offset'] = offset
+                    node['length'] = binary_io.tell() - offset
+                    nodes.append(node)
+
+                anim_transforms = []
+                n_channels = self.read_uint16(binary_io)
+                for i in range(n_channels):
+                    offset = binary_io.tell()
+                    node_ref = self.read_string(binary_io)
+                    period_offset = binary_io.tell() + self.UINT16_BYTES_SIZE  # after the keyframe count
+                    binary_io.seek(offset)
+                    self.skip_anim_channel(binary_io)
+                    anim_transforms.append({'node_ref': node_ref, 'offset': offset, 'length': binary_io.tell() - offset, 'period_offset': period_offset})
+
+                anim_tex_refs = []
+                n_references = self.read_uint16(binary_io)
+                for i in range(n_references):
+                    offset = binary_io.tell()
+                    reference = self.read_anim_reference(binary_io)
+                    anim_tex_refs.append({'node': reference['node'], 'offset': offset, 'length': binary_io.tell() - offset})
+            finally:
+                binary_io.release()
+
+        return {
+            'parser_version': __version__,
+            'index_version': self.INDEX_FORMAT_VERSION,
+            'file_size': stat.st_size,
+            'file_mtime': stat.st_mtime_ns,
+            'version': version,
+            'materials': materials,
+            'nodes': nodes,
+            'anim_transforms': anim_transforms,
+            'anim_tex_refs': anim_tex_refs
+        }
+
+    @classmethod
+    def is_index_valid(cls, index: dict, file_path) -> bool:
+        stat = os.stat(file_path)
+        return (index.get('parser_version') == __version__
+                and index.get('index_version') == cls.INDEX_FORMAT_VERSION
+                and index.get('file_size') == stat.st_size
+                and index.get('file_mtime') == stat.st_mtime_ns)
+
+    def get_index(self, file_path, use_sidecar=False) -> dict:
+        """
+        Returns the node offset index of the file. With use_sidecar the index is loaded from the sidecar file next to the sod
+        if it's still valid (same file size, mtime and parser version), otherwise it's rebuilt and saved again.
+        Without it the index is rebuilt every time and nothing is written next to the sod.
+        """
+        sidecar_path = file_path + self.INDEX_SIDECAR_SUFFIX
+        if use_sidecar and os.path.isfile(sidecar_path):
+            try:
+                with open(sidecar_path, 'r') as sidecar:
+                    index = json.load(sidecar)
+                if self.is_index_valid(index, file_path):
+                    return index
+            except (OSError, ValueError):
+                pass  # unreadable sidecar, rebuild it
+
+        index = self.build_index(file_path)
+        if use_sidecar:
+            self.save_index(file_path, index)
+        return index
+
+    def save_index(self, file_path, index: dict):
+        sidecar_path = file_path + self.INDEX_SIDECAR_SUFFIX
+        try:
+            with open(sidecar_path, 'w') as sidecar:
+                json.dump(index, sidecar)
+        except OSError as e:
+            print(f"Warning: unable to save index to {sidecar_path}: {e}")
+
+    def read_node(self, file_path, node_id: str, index: dict = None, use_sidecar=False) -> Node:
+        """
+        seeks directly to a single node using the node offset index, nothing else in the file is parsed
+
+        :param use_sidecar: load/save the index from/to a sidecar file next to the sod, see get_index()
+        """
+        if index is None or not self.is_index_valid(index, file_path):
+            index = self.get_index(file_path, use_sidecar)
+
+        entry = next((node for node in index['nodes'] if node['id'] == node_id), None)
+        if entry is None:
+            raise KeyError(f"node '{node_id}' not found in {file_path}")
+
+        with self.map_file(file_path) as buffer:
+            binary_io = SodReader(buffer, index['version'])
+            try:
+                binary_io.seek(entry['offset'])
+                return self.read_single_node(binary_io)
+            finally:
+                binary_io.release()
+
+    def read_many(self, file_paths, max_workers=None, chunksize=1, ordered=True):
+        """
+        Parses the files on a process pool and yields a (file_path, sod, error) tuple per file.
+        Errors are reported per file (sod is None) instead of aborting the whole batch.
+        The parsed sods are pickled back to this process, use_numpy=True makes that transfer much cheaper.
+
+        :param max_workers: number of worker processes, defaults to the cpu count, 1 parses in this process
+        :param chunksize: number of files sent to a worker at once
+        :param ordered: yield the results in the order of file_paths instead of as soon as they are done
+        """
+        return process_many(self.read_file, file_paths, max_workers, chunksize, ordered)
+
+    def read_directory(self, dir_path, recursive=False, **kwargs):
+        """parses all .sod files in the directory on a process pool, see read_many() for the arguments and results"""
+        return self.read_many(self.find_sod_files(dir_path, recursive), **kwargs)
+
+    @staticmethod
+    def find_sod_files(dir_path, recursive=False) -> list:
+        pattern = os.path.join(dir_path, '**', '*') if recursive else os.path.join(dir_path, '*')
+        return sorted(path for path in glob.glob(pattern, recursive=recursive) if path.lower().endswith('.sod') and os.path.isfile(path))
+
+    def read_buffer(self, buffer, file_name='') -> Sod:
+        """parses a sod from any bytes-like object, e.g. bytes, bytearray, memoryview or mmap"""
+        reader = SodReader(buffer)
+        try:
+            return self.__parse_sod(reader, file_name)
+        finally:
+            reader.release()
 
     def write_file(self, sod: Sod, file_path: str):
-        self.__write_sod(sod, file_path)
-
-    def __parse_sod(self, file_path: str) -> Sod:
-        binary_io: BinaryIO
-        with open(file_path, "rb") as binary_io:
-            binary_io.seek(0, 2)  # seek the end
-            bytes_ = binary_io.tell()  # file size
-            print(f"reading {bytes_} bytes from file...")
-
-            for i in range(bytes_):
-                binary_io.seek(i)
-
-                header_bytes = binary_io.read(self.MAGIC_STRING_SIZE)
-                if header_bytes == self.MAGIC_STRING:
-
-                    self.curr_sod_version = self.read_float(binary_io)
-                    print('SOD Format Version:', '{:.2f}'.format(self.curr_sod_version), f'({self.curr_sod_version})')  # print version as float32 representation
-
-                    # noinspection PyChainedComparisons
-                    if self.curr_sod_version >= 1.6 and self.curr_sod_version <= 1.93:
-                        sod = Sod(file_name=file_path.split("\\")[-1], version=self.curr_sod_version)
-                        if self.curr_sod_version <= 1.81:
-                            sod.set_legacy_data(self.read_unknown_legacy_data(binary_io))
-                        sod.set_materials(self.read_lighting_materials(binary_io))
-                        sod.set_nodes(self.read_nodes(binary_io))
-                        sod.set_animation_transforms(self.read_animation_transforms(binary_io))
-                        sod.set_animation_tex_refs(self.read_anim_tex_refs(binary_io))
-                        return sod
+        """assembles the whole file in memory and writes it at once"""
+        binary_io = self.__write_sod(sod)
+        with open(file_path, "wb") as stream:
+            stream.write(binary_io.getbuffer())
+
+        bytes_ = binary_io.tell()  # file size
+        print(f"wrote {bytes_} bytes to {file_path}")
+
+    def write_stream(self, sod: Sod, stream: BinaryIO):
+        stream.write(self.__write_sod(sod).getbuffer())
+
+    def write_bytes(self, sod: Sod) -> bytes:
+        return bytes(self.__write_sod(sod).getbuffer())
+
+    def __parse_sod(self, binary_io: SodReader, file_name: str) -> Sod:
+        bytes_ = binary_io.size
+        print(f"reading {bytes_} bytes from file...")
+
+        version = self.read_header(binary_io)
+        print('SOD Format Version:', '{:.2f}'.format(version), f'({version})')  # print version as float32 representation
+
+        sod = Sod(file_name=file_name, version=version)
+        if version <= 1.81:
+            sod.set_legacy_data(self.read_unknown_legacy_data(binary_io))
+        sod.set_materials(self.read_lighting_materials(binary_io))
+        if self.lod is None:
+            sod.set_nodes(self.read_nodes(binary_io))
+            skipped_ids = set()
+        else:
+            nodes, skipped_ids = self.read_lod_nodes(binary_io, self.lod)
+            sod.set_nodes(nodes)
+        animation_transforms = self.read_animation_transforms(binary_io)
+        animation_tex_refs = self.read_anim_tex_refs(binary_io)
+        if skipped_ids:  # the skipped nodes can't be referenced anymore
+            animation_transforms = [channel for channel in animation_transforms if channel['node_ref'] not in skipped_ids]
+            animation_tex_refs = [reference for reference in animation_tex_refs if reference['node'] not in skipped_ids]
+        sod.set_animation_transforms(animation_transforms)
+        sod.set_animation_tex_refs(animation_tex_refs)
+        return sod
+
+    def read_header(self, binary_io: SodReader) -> float:
+        """
+        Locates the signature and reads the sod version into the reader context,
+        leaves the reader at the start of the sod data.
+        """
+        binary_io.seek(self.find_signature(binary_io) + self.MAGIC_STRING_SIZE)
+
+        version = self.read_float(binary_io)
+
+        # noinspection PyChainedComparisons
+        if version >= 1.6 and version <= 1.93:
+            binary_io.version = version
+            return version
+        else:
+            raise Exception('Unsupported SOD Version')
+
+    def scan_summary(self, file_path) -> dict:
+        """
+        Returns the version, material names, node hierarchy and per mesh texture names and vertex/face counts.
+        The vertex, uv and face payloads are skipped over instead of being decoded.
+        """
+        with self.map_file(file_path) as buffer:
+            binary_io = SodReader(buffer)
+            try:
+                version = self.read_header(binary_io)
+                if version <= 1.81:
+                    self.read_unknown_legacy_data(binary_io)
+                materials = self.read_lighting_materials(binary_io)
+
+                nodes = []
+                n_nodes = self.read_uint16(binary_io)
+                for i in range(n_nodes):
+                    node_type, node = self.read_node_header(binary_io)
+                    binary_io.seek(self.MATRIX34_STRUCT.size, 1)  # local transform
+                    if node_type is NodeType.MESH:
+                        node['mesh'] = self.read_mesh_summary(binary_io)
                     else:
-                        raise Exception('Unsupported SOD Version')
-
-                elif header_bytes == b'StarTrekDB':
-                    raise Exception('Database found instead of Storm3D File')
-
-    def __write_sod(self, sod: Sod, file_path):
-        binary_io: BinaryIO
-        with open(file_path, "wb") as binary_io:
-            # noinspection PyChainedComparisons
-            if self.curr_sod_version >= 1.6 and self.curr_sod_version <= 1.93:
-                binary_io.write(self.MAGIC_STRING)
-                print('targeting sod format version:', '{:.2f}'.format(sod.version))
-                self.write_float(sod.version, binary_io)
-
-                if self.curr_sod_version <= 1.81:
-                    self.write_unknown_legacy_data(sod.unknown_legacy_data, binary_io)
-
-                self.write_lighting_materials(sod.materials, binary_io)
-                self.write_nodes(sod.nodes, binary_io)
-                self.write_animation_transforms(sod.animation_transforms, binary_io)
-                self.write_anim_tex_refs(sod.animation_tex_refs, binary_io)
-            else:
-                raise Exception('Unsupported SOD Version')
+                        self.read_typed_node(node_type, binary_io)
+                    nodes.append(node)
+            finally:
+                binary_io.release()
+
+        return {
+            'file_name': file_path.split("\\")[-1],
+            'version': version,
+            'materials': [material['name'] for material in materials],
+            'nodes': nodes
+        }
 
-            bytes_ = binary_io.tell()  # file size
-            print(f"wrote {bytes_} bytes to {file_path}")
+    def find_signature(self, binary_io: SodReader) -> int:
+        """
+        Returns the offset of the Storm3D signature.
+
+        Regular files start with the signature (or with the database signature), so they are accepted or rejected
+        by looking at the header only. Files with leading junk are searched with a single buffered find.
+        """
+        binary_io.seek(0)
+        header_bytes = binary_io.read(self.MAGIC_STRING_SIZE)
+        if header_bytes == self.MAGIC_STRING:
+            return 0
+        elif header_bytes == self.DATABASE_MAGIC_STRING:
+            raise Exception('Database found instead of Storm3D File')
+
+        offset = binary_io.find(self.MAGIC_STRING)
+        # a database signature in front of the first Storm3D signature takes precedence
+        db_end = None if offset < 0 else offset + len(self.DATABASE_MAGIC_STRING) - 1
+        if binary_io.find(self.DATABASE_MAGIC_STRING, 0, db_end) >= 0:
+            raise Exception('Database found instead of Storm3D File')
+        if offset < 0:
+            raise Exception('No Storm3D signature found')
+        return offset
+
+    def __write_sod(self, sod: Sod) -> SodWriter:
+        # noinspection PyChainedComparisons
+        if sod.version >= 1.6 and sod.version <= 1.93:
+            binary_io = SodWriter(sod.version, self.estimate_size(sod))
+            binary_io.write(self.MAGIC_STRING)
+            print('targeting sod format version:', '{:.2f}'.format(sod.version))
+            self.write_float(sod.version, binary_io)
+
+            if binary_io.version <= 1.81:
+                self.write_unknown_legacy_data(sod.unknown_legacy_data, binary_io)
+
+            self.write_lighting_materials(sod.materials, binary_io)
+            self.write_nodes(sod.nodes, binary_io)
+            self.write_animation_transforms(sod.animation_transforms, binary_io)
+            self.write_anim_tex_refs(sod.animation_tex_refs, binary_io)
+            return binary_io
+        else:
+            raise Exception('Unsupported SOD Version')
+
+    def estimate_size(self, sod: Sod) -> int:
+        """estimates the size of the written file from the element counts, used to pre-size the output buffer"""
+        size = 1024 + 256 * (len(sod.materials or []) + len(sod.nodes or []) + len(sod.animation_tex_refs or []))
+        for node in sod.nodes or []:
+            if node['type'] == NodeType.MESH.name:
+                mesh = node['data']
+                size += self.VECTOR3_STRUCT.size * len(mesh['vertices']) + self.VECTOR2_STRUCT.size * len(mesh['texture_coordinates'])
+                for vlg in mesh['vertex_lighting_groups']:
+                    size += 256 + self.FACE_STRUCT.size * len(vlg['faces'])
+        for channel in sod.animation_transforms or []:
+            size += 256 + self.MATRIX34_STRUCT.size * len(channel['keyframe_data'])
+        return size
 
     def read_string(self, binary_io: BinaryIO):
         # read string length
@@ -247,50 +1223,47 @@ class SodIO:
 
         # read string
         str_bytes = binary_io.read(self.UINT8_BYTES_SIZE * length)
-        i_tuple = struct.unpack('<' + str(length) + 'B', str_bytes)
-        string = bytes(i_tuple).decode('ascii')
+        string = str(str_bytes, 'ascii')
         if string == '0':  # 0 indicates null string
             string = None
         return string
 
-    def write_string(self, string: str, binary_io: BinaryIO):
+    def skip_string(self, binary_io: BinaryIO):
+        length = self.read_uint16(binary_io)
+        binary_io.seek(self.UINT8_BYTES_SIZE * length, 1)
+
+    def write_string(self, string: str, binary_io: SodWriter):
         if string is None:
             string = '0'  # indicates null string
 
         str_bytes = string.encode('ascii')
         length = len(str_bytes)
         self.write_uint16(length, binary_io)
-
-        for byte_ in str_bytes:
-            byte_ = struct.pack(f'<B', byte_)
-            binary_io.write(byte_)
+        binary_io.write(str_bytes)
 
     def read_uint8(self, binary_io: BinaryIO):
         bytes_ = binary_io.read(self.UINT8_BYTES_SIZE)
         value = struct.unpack(self.UINT8, bytes_)[0]
         return value
 
-    def write_uint8(self, value, binary_io: BinaryIO):
-        bytes_ = struct.pack(self.UINT8, value)
-        binary_io.write(bytes_)
+    def write_uint8(self, value, binary_io: SodWriter):
+        binary_io.pack(self.UINT8_STRUCT, value)
 
     def read_uint16(self, binary_io: BinaryIO):
         bytes_ = binary_io.read(self.UINT16_BYTES_SIZE)
         value = struct.unpack(self.UINT16, bytes_)[0]
         return value
 
-    def write_uint16(self, value, binary_io: BinaryIO):
-        bytes_ = struct.pack(self.UINT16, value)
-        binary_io.write(bytes_)
+    def write_uint16(self, value, binary_io: SodWriter):
+        binary_io.pack(self.UINT16_STRUCT, value)
 
     def read_uint32(self, binary_io: BinaryIO):
         bytes_ = binary_io.read(self.UINT32_BYTES_SIZE)
         value = struct.unpack(self.UINT32, bytes_)[0]
         return value
 
-    def write_uint32(self, value, binary_io: BinaryIO):
-        bytes_ = struct.pack(self.UINT32, value)
-        binary_io.write(bytes_)
+    def write_uint32(self, value, binary_io: SodWriter):
+        binary_io.pack(self.UINT32_STRUCT, value)
 
     def read_float(self, binary_io: BinaryIO):
         f_bytes = binary_io.read(self.FLOAT_BYTE_SIZE)
@@ -298,9 +1271,8 @@ class SodIO:
         # note: floats in python are double precision
         return f
 
-    def write_float(self, value, binary_io: BinaryIO):
-        bytes_ = struct.pack(self.FLOAT, value)
-        binary_io.write(bytes_)
+    def write_float(self, value, binary_io: SodWriter):
+        binary_io.pack(self.FLOAT_STRUCT, value)
 
     def read_color(self, binary_io: BinaryIO):
         r = self.read_float(binary_io)
@@ -308,19 +1280,16 @@ class SodIO:
         b = self.read_float(binary_io)
         return [r, g, b]
 
-    def write_color(self, colors, binary_io: BinaryIO):
-        self.write_float(colors[0], binary_io)  # r
-        self.write_float(colors[1], binary_io)  # g
-        self.write_float(colors[2], binary_io)  # b
+    def write_color(self, colors, binary_io: SodWriter):
+        binary_io.pack(self.VECTOR3_STRUCT, colors[0], colors[1], colors[2])  # r, g, b
 
     def read_vector2(self, binary_io: BinaryIO):
         u = self.read_float(binary_io)
         v = self.read_float(binary_io)
         return [u, v]
 
-    def write_vector2(self, vector2, binary_io: BinaryIO):
-        self.write_float(vector2[0], binary_io)  # u
-        self.write_float(vector2[1], binary_io)  # v
+    def write_vector2(self, vector2, binary_io: SodWriter):
+        binary_io.pack(self.VECTOR2_STRUCT, vector2[0], vector2[1])  # u, v
 
     def read_vector3(self, binary_io: BinaryIO):
         x = self.read_float(binary_io)
@@ -328,10 +1297,8 @@ class SodIO:
         z = self.read_float(binary_io)
         return [x, y, z]
 
-    def write_vector3(self, vector3, binary_io: BinaryIO):
-        self.write_float(vector3[0], binary_io)  # x
-        self.write_float(vector3[1], binary_io)  # y
-        self.write_float(vector3[2], binary_io)  # z
+    def write_vector3(self, vector3, binary_io: SodWriter):
+        binary_io.pack(self.VECTOR3_STRUCT, vector3[0], vector3[1], vector3[2])  # x, y, z
 
     def read_matrix34(self, binary_io: BinaryIO):
         right = self.read_vector3(binary_io)
@@ -340,63 +1307,106 @@ class SodIO:
         position = self.read_vector3(binary_io)
         return [right, up, front, position]
 
-    def write_matrix34(self, matrix34, binary_io: BinaryIO):
-        self.write_vector3(matrix34[0], binary_io)  # right
-        self.write_vector3(matrix34[1], binary_io)  # up
-        self.write_vector3(matrix34[2], binary_io)  # front
-        self.write_vector3(matrix34[3], binary_io)  # position
+    def write_matrix34(self, matrix34, binary_io: SodWriter):
+        binary_io.pack(self.MATRIX34_STRUCT, *chain.from_iterable(matrix34))  # right, up, front, position
 
     def read_face_vertex(self, binary_io: BinaryIO):
         index_vertices = self.read_uint16(binary_io)
         index_texture_cords = self.read_uint16(binary_io)
         return [index_vertices, index_texture_cords]
 
-    def write_face_vertex(self, face_vertex, binary_io: BinaryIO):
-        self.write_uint16(face_vertex[0], binary_io)  # index_vertices
-        self.write_uint16(face_vertex[1], binary_io)  # index_texture_cords
+    def write_face_vertex(self, face_vertex, binary_io: SodWriter):
+        binary_io.pack(self.FACE_VERTEX_STRUCT, face_vertex[0], face_vertex[1])  # index_vertices, index_texture_cords
 
     def read_face(self, binary_io: BinaryIO):
         face_vertices = self.read_face_vertex_array(3, binary_io)
         return face_vertices
 
-    def write_face(self, face_vertices, binary_io: BinaryIO):
-        self.write_face_vertex(face_vertices[0], binary_io)
-        self.write_face_vertex(face_vertices[1], binary_io)
-        self.write_face_vertex(face_vertices[2], binary_io)
+    def write_face(self, face_vertices, binary_io: SodWriter):
+        binary_io.pack(self.FACE_STRUCT, *chain.from_iterable(face_vertices))
+
+    def write_face_array(self, faces, binary_io: SodWriter):
+        if _is_ndarray(faces):
+            self.write_ndarray(faces, '<u2', (3, 2), binary_io)
+        else:
+            # pack the whole face block at once
+            binary_io.pack(f'<{len(faces) * 6}H', *chain.from_iterable(chain.from_iterable(faces)))
+
+    def write_vector3_array(self, vectors, binary_io: SodWriter):
+        if _is_ndarray(vectors):
+            self.write_ndarray(vectors, '<f4', (3,), binary_io)
+        else:
+            binary_io.pack(f'<{len(vectors) * 3}f', *chain.from_iterable(vectors))
+
+    def write_vector2_array(self, vectors, binary_io: SodWriter):
+        if _is_ndarray(vectors):
+            self.write_ndarray(vectors, '<f4', (2,), binary_io)
+        else:
+            binary_io.pack(f'<{len(vectors) * 2}f', *chain.from_iterable(vectors))
+
+    def write_matrix34_array(self, matrices, binary_io: SodWriter):
+        if _is_ndarray(matrices):
+            self.write_ndarray(matrices, '<f4', (4, 3), binary_io)
+        else:
+            binary_io.pack(f'<{len(matrices) * 12}f', *chain.from_iterable(chain.from_iterable(matrices)))
+
+    # noinspection PyMethodMayBeStatic
+    def write_ndarray(self, array, dtype: str, element_shape: tuple, binary_io: SodWriter):
+        """writes a whole array block with a single conversion, e.g. vertices (N,3) as '<f4' or faces (F,3,2) as '<u2'"""
+        if array.shape[1:] != element_shape:
+            raise ValueError(f'expected an array of shape (N, {", ".join(map(str, element_shape))}) but got {array.shape}')
+
+        target = np.dtype(dtype)
+        if target.kind == 'u' and array.size > 0 and not np.can_cast(array.dtype, target):
+            info = np.iinfo(target)  # indices must fit, astype would silently wrap them
+            if array.min() < info.min or array.max() > info.max:
+                raise ValueError(f'array values are out of range for {dtype}')
+
+        binary_io.write(array.astype(dtype, copy=False).tobytes())
 
     def read_vertex_lighting_group(self, binary_io: BinaryIO):
         n_faces = self.read_uint16(binary_io)
         lighting_material = self.read_string(binary_io)  # 0 -> default
-        faces = self.read_face_array(n_faces, binary_io)
-        return {'lighting_material': lighting_material, 'faces': faces}
+        faces = self.read_face_ndarray(n_faces, binary_io) if self.use_numpy else self.read_face_array(n_faces, binary_io)
+        return VertexLightingGroup(lighting_material, faces)
 
-    def write_vertex_lighting_group(self, vlg: dict, binary_io: BinaryIO):
+    def write_vertex_lighting_group(self, vlg: dict, binary_io: SodWriter):
         self.write_uint16(len(vlg['faces']), binary_io)
         if vlg['lighting_material'] is None:
             self.write_string('0', binary_io)
         else:
             self.write_string(vlg['lighting_material'], binary_io)
 
-        for face_vertices in vlg['faces']:
-            self.write_face(face_vertices, binary_io)
+        self.write_face_array(vlg['faces'], binary_io)
 
     def read_anim_channel(self, binary_io: BinaryIO):
-        anim = dict()
-        anim['node_ref'] = self.read_string(binary_io)  # node to which this animation channel refers
+        node_ref = self.read_string(binary_io)  # node to which this animation channel refers
         n_keyframes = self.read_uint16(binary_io)
-        anim['period'] = self.read_float(binary_io)  # length of time one loop of this channel lasts
-        anim['type'] = self.read_uint16(binary_io)  # 0 -> position, 5 -> scale  (unused in sod version 1.8)
+        period = self.read_float(binary_io)  # length of time one loop of this channel lasts
+        anim_type = self.read_uint16(binary_io)  # 0 -> position, 5 -> scale  (unused in sod version 1.8)
+        anim = AnimChannel(node_ref, period, anim_type, None)
 
-        if anim['type'] == 0:
+        if anim_type == 0:
             # animation transforms, evenly spaced over time 'channel period'
-            anim['keyframe_data'] = self.read_matrix34_array(n_keyframes, binary_io)
+            anim.keyframe_data = self.read_matrix34_array(n_keyframes, binary_io)
 
-        elif anim['type'] == 5:
-            anim['keyframe_data'] = self.read_float_array(n_keyframes, binary_io)
+        elif anim_type == 5:
+            anim.keyframe_data = self.read_float_array(n_keyframes, binary_io)
 
         return anim
 
-    def write_anim_channel(self, anim_channel: dict, binary_io: BinaryIO):
+    def skip_anim_channel(self, binary_io: BinaryIO):
+        self.skip_string(binary_io)  # node_ref
+        n_keyframes = self.read_uint16(binary_io)
+        binary_io.seek(self.FLOAT_BYTE_SIZE, 1)  # period
+        anim_type = self.read_uint16(binary_io)
+
+        if anim_type == 0:
+            binary_io.seek(self.MATRIX34_STRUCT.size * n_keyframes, 1)
+        elif anim_type == 5:
+            binary_io.seek(self.FLOAT_BYTE_SIZE * n_keyframes, 1)
+
+    def write_anim_channel(self, anim_channel: dict, binary_io: SodWriter):
         self.write_string(anim_channel['node_ref'], binary_io)
         n_keyframes = len(anim_channel['keyframe_data'])
         self.write_uint16(n_keyframes, binary_io)
@@ -404,37 +1414,30 @@ class SodIO:
         self.write_uint16(anim_channel['type'], binary_io)
 
         if anim_channel['type'] == 0:
-            for data in anim_channel['keyframe_data']:
-                self.write_matrix34(data, binary_io)
+            self.write_matrix34_array(anim_channel['keyframe_data'], binary_io)
         elif anim_channel['type'] == 5:
-            for data in anim_channel['keyframe_data']:
-                self.write_float(data, binary_io)
+            binary_io.pack(f'<{n_keyframes}f', *anim_channel['keyframe_data'])
 
     def read_anim_reference(self, binary_io: BinaryIO):
-        ref = dict()
-        ref['type'] = self.read_uint8(binary_io)  # must be 4
-        ref['node'] = self.read_string(binary_io)  # node to which this animation applies
-        ref['anim'] = self.read_string(binary_io)  # animation (as defined in .spr files) that is to be applied to this node
-        ref['playback_offset'] = self.read_float(binary_io)  # Time offset in seconds to be applied to this animation reference
-        return ref
-
-    def write_anim_reference(self, anim_reference: dict, binary_io: BinaryIO):
+        ref_type = self.read_uint8(binary_io)  # must be 4
+        node = self.read_string(binary_io)  # node to which this animation applies
+        anim = self.read_string(binary_io)  # animation (as defined in .spr files) that is to be applied to this node
+        playback_offset = self.read_float(binary_io)  # Time offset in seconds to be applied to this animation reference
+        return AnimReference(ref_type, node, anim, playback_offset)
+
+    def write_anim_reference(self, anim_reference: dict, binary_io: SodWriter):
         self.write_uint8(anim_reference['type'], binary_io)
-        self.write_uint8(anim_reference['node'], binary_io)
-        self.write_uint8(anim_reference['anim'], binary_io)
+        self.write_string(anim_reference['node'], binary_io)
+        self.write_string(anim_reference['anim'], binary_io)
         self.write_float(anim_reference['playback_offset'], binary_io)
 
     def read_float_array(self, n_entries, binary_file):
-        typed_array = []
-        for n in range(n_entries):
-            typed_array.append(self.read_float(binary_file))
-        return typed_array
+        bytes_ = binary_file.read(self.FLOAT_BYTE_SIZE * n_entries)
+        return list(struct.unpack(f'<{n_entries}f', bytes_))
 
     def read_matrix34_array(self, n_entries, binary_file):
-        typed_array = []
-        for n in range(n_entries):
-            typed_array.append(self.read_matrix34(binary_file))
-        return typed_array
+        bytes_ = binary_file.read(self.MATRIX34_STRUCT.size * n_entries)
+        return [[list(m[0:3]), list(m[3:6]), list(m[6:9]), list(m[9:12])] for m in self.MATRIX34_STRUCT.iter_unpack(bytes_)]
 
     def read_anim_reference_array(self, n_entries, binary_file):
         typed_array = []
@@ -455,22 +1458,32 @@ class SodIO:
         return typed_array
 
     def read_face_array(self, n_entries, binary_file):
-        typed_array = []
-        for n in range(n_entries):
-            typed_array.append(self.read_face(binary_file))
-        return typed_array
+        # read the whole face block at once and decode it in one pass
+        bytes_ = binary_file.read(self.FACE_STRUCT.size * n_entries)
+        return [[[v0, t0], [v1, t1], [v2, t2]] for v0, t0, v1, t1, v2, t2 in self.FACE_STRUCT.iter_unpack(bytes_)]
 
     def read_vector3_array(self, n_entries, binary_file):
-        typed_array = []
-        for n in range(n_entries):
-            typed_array.append(self.read_vector3(binary_file))
-        return typed_array
+        bytes_ = binary_file.read(self.VECTOR3_STRUCT.size * n_entries)
+        return [list(vector3) for vector3 in self.VECTOR3_STRUCT.iter_unpack(bytes_)]
 
     def read_vector2_array(self, n_entries, binary_file):
-        typed_array = []
-        for n in range(n_entries):
-            typed_array.append(self.read_vector2(binary_file))
-        return typed_array
+        bytes_ = binary_file.read(self.VECTOR2_STRUCT.size * n_entries)
+        return [list(vector2) for vector2 in self.VECTOR2_STRUCT.iter_unpack(bytes_)]
+
+    def read_ndarray(self, dtype: str, shape: tuple, binary_file):
+        """decodes a block straight from the file bytes, the array is a native copy so it doesn't keep the file mapped"""
+        dtype = np.dtype(dtype)
+        bytes_ = binary_file.read(dtype.itemsize * int(np.prod(shape)))
+        return np.frombuffer(bytes_, dtype=dtype).astype(dtype.newbyteorder('=')).reshape(shape)
+
+    def read_face_ndarray(self, n_entries, binary_file):
+        return self.read_ndarray('<u2', (n_entries, 3, 2), binary_file)
+
+    def read_vector3_ndarray(self, n_entries, binary_file):
+        return self.read_ndarray('<f4', (n_entries, 3), binary_file)
+
+    def read_vector2_ndarray(self, n_entries, binary_file):
+        return self.read_ndarray('<f4', (n_entries, 2), binary_file)
 
     def read_vertex_lighting_group_array(self, n_entries, binary_file):
         typed_array = []
@@ -495,40 +1508,42 @@ class SodIO:
             })
         return data_list
 
-    def write_unknown_legacy_data(self, legacy_data, binary_io: BinaryIO):
+    def write_unknown_legacy_data(self, legacy_data, binary_io: SodWriter):
         data_count = len(legacy_data)
         self.write_uint16(data_count, binary_io)
         for data in legacy_data:
             self.write_string(data['id1'], binary_io)
             self.write_string(data['id2'], binary_io)
-            for byte_ in data["unknown"]:
-                self.write_uint8(byte_, binary_io)
+            binary_io.pack(f'<{len(data["unknown"])}B', *data["unknown"])
 
     def read_lighting_materials(self, binary_io: BinaryIO):
         n_lighting_mat = self.read_uint16(binary_io)
         materials = []
 
         for i in range(0, n_lighting_mat):
-            material = {
-                'name': self.read_string(binary_io),
-                'ambient_color': self.read_color(binary_io),
-                'diffuse_color': self.read_color(binary_io),
-                'specular_color': self.read_color(binary_io),
-                'specular_shininess': self.read_float(binary_io),
-                'lighting_model': LightingModel(self.read_uint8(binary_io)),
-                'self_illumination_enabled': False
-            }
-
-            if self.curr_sod_version > 1.8001:
-                alpha = self.read_uint8(binary_io)  # alpha map illumination
-                if alpha > 0:
-                    material['self_illumination_enabled'] = True
-
-            materials.append(material)
+            materials.append(self.read_lighting_material(binary_io))
 
         return materials
 
-    def write_lighting_materials(self, materials: list, binary_io: BinaryIO):
+    def read_lighting_material(self, binary_io: BinaryIO) -> Material:
+        material = Material(
+            name=self.read_string(binary_io),
+            ambient_color=self.read_color(binary_io),
+            diffuse_color=self.read_color(binary_io),
+            specular_color=self.read_color(binary_io),
+            specular_shininess=self.read_float(binary_io),
+            lighting_model=LightingModel(self.read_uint8(binary_io)),
+            self_illumination_enabled=False
+        )
+
+        if binary_io.version > 1.8001:
+            alpha = self.read_uint8(binary_io)  # alpha map illumination
+            if alpha > 0:
+                material.self_illumination_enabled = True
+
+        return material
+
+    def write_lighting_materials(self, materials: list, binary_io: SodWriter):
         n_lighting_mat = len(materials)
         self.write_uint16(n_lighting_mat, binary_io)
 
@@ -541,7 +1556,7 @@ class SodIO:
             lighting_model: LightingModel = material['lighting_model']
             self.write_uint8(lighting_model.value, binary_io)
 
-            if self.curr_sod_version > 1.8001:
+            if binary_io.version > 1.8001:
                 value = 1 if material['self_illumination_enabled'] else 0
                 self.write_uint8(value, binary_io)
 
@@ -556,7 +1571,7 @@ class SodIO:
         """
         return None
 
-    def write_null_node(self, data, binary_io: BinaryIO):
+    def write_null_node(self, data, binary_io: SodWriter):
         return
 
     # noinspection PyMethodMayBeStatic,PyUnusedLocal
@@ -570,7 +1585,7 @@ class SodIO:
         """
         return None
 
-    def write_lod_node(self, data, binary_io: BinaryIO):
+    def write_lod_node(self, data, binary_io: SodWriter):
         return
 
     # noinspection PyMethodMayBeStatic,PyUnusedLocal
@@ -583,7 +1598,7 @@ class SodIO:
         """
         return None
 
-    def write_sprite_node(self, data, binary_io: BinaryIO):
+    def write_sprite_node(self, data, binary_io: SodWriter):
         return
 
     def read_emitter_node(self, binary_io: BinaryIO):
@@ -591,11 +1606,12 @@ class SodIO:
         emitter_id = self.read_string(binary_io)
         return emitter_id
 
-    def write_emitter_node(self, emitter_id: str, binary_io: BinaryIO):
+    def write_emitter_node(self, emitter_id: str, binary_io: SodWriter):
         self.write_string(emitter_id, binary_io)
 
     # noinspection PyUnusedLocal
-    def read_mesh_node(self, binary_io: BinaryIO):
+    def read_mesh_header(self, binary_io: BinaryIO):
+        """reads the texture and material fields in front of the vertex data of a mesh node"""
         mesh = dict()
 
         """
@@ -608,21 +1624,21 @@ class SodIO:
         alpha - Uses entire alpha channel. Object will require sorting, so will have performance implications.
         wireframe - Use wireframe graphics.
         """
-        mesh['texture_material'] = self.read_string(binary_io) if self.curr_sod_version > 1.61 else "default"  # 0 -> default
+        mesh['texture_material'] = self.read_string(binary_io) if binary_io.version > 1.61 else "default"  # 0 -> default
 
         mesh['bump_map'] = 0
-        if self.curr_sod_version > 1.9101:
+        if binary_io.version > 1.9101:
             unused = self.read_uint32(binary_io)
             mesh['bump_map'] = self.read_uint32(binary_io)
 
         texture = self.read_string(binary_io)  # 0 -> untextured
         mesh['texture'] = texture
 
-        if self.curr_sod_version == 1.91:
+        if abs(binary_io.version - 1.91) < 0.0001:
             unknown = self.read_uint16(binary_io)
 
         # borg texture (assimilated entity)
-        if self.curr_sod_version > 1.9101:
+        if binary_io.version > 1.9101:
             mesh['borgification'] = borg = {}
 
             unknown = self.read_uint16(binary_io)
@@ -635,19 +1651,29 @@ class SodIO:
                 unknown = self.read_uint16(binary_io)
 
             borg['texture'] = self.read_string(binary_io)  # can be empty?
-            if borg['texture'].strip() == '':
-                borg['texture'] = texture + '_B'
+            if borg['texture'] is None or borg['texture'].strip() == '':
+                borg['texture'] = texture + '_B' if texture is not None else None  # untextured
 
             unknown = self.read_uint16(binary_io)
 
+        return mesh
+
+    # noinspection PyUnusedLocal
+    def read_mesh_node(self, binary_io: BinaryIO):
+        mesh = Mesh(**self.read_mesh_header(binary_io))
+
         n_vertices = self.read_uint16(binary_io)
         n_texture_coords = self.read_uint16(binary_io)
         n_groups = self.read_uint16(binary_io)  # vertex lighting groups
-        mesh['vertices'] = self.read_vector3_array(n_vertices, binary_io)
-        mesh['texture_coordinates'] = self.read_vector2_array(n_texture_coords, binary_io)
-        mesh['vertex_lighting_groups'] = self.read_vertex_lighting_group_array(n_groups, binary_io)
+        if self.use_numpy:
+            mesh.vertices = self.read_vector3_ndarray(n_vertices, binary_io)
+            mesh.texture_coordinates = self.read_vector2_ndarray(n_texture_coords, binary_io)
+        else:
+            mesh.vertices = self.read_vector3_array(n_vertices, binary_io)
+            mesh.texture_coordinates = self.read_vector2_array(n_texture_coords, binary_io)
+        mesh.vertex_lighting_groups = self.read_vertex_lighting_group_array(n_groups, binary_io)
 
-        mesh['cull_type'] = 'NO_CULL' if self.read_uint8(binary_io) == 0 else 'BACKFACE_CULL'  # 0 -> no cull, 1 -> backface cull
+        mesh.cull_type = 'NO_CULL' if self.read_uint8(binary_io) == 0 else 'BACKFACE_CULL'  # 0 -> no cull, 1 -> backface cull
 
         unused = self.read_uint16(binary_io)
         if unused != 0:
@@ -655,21 +1681,60 @@ class SodIO:
 
         return mesh
 
-    def write_mesh_node(self, mesh: dict, binary_io: BinaryIO):
-        if self.curr_sod_version > 1.61:
+    def read_mesh_summary(self, binary_io: BinaryIO):
+        """
+        Reads the texture fields and counts of a mesh node and skips over the vertex, uv and face payloads,
+        their sizes are computed from the counts.
+        """
+        mesh = self.read_mesh_header(binary_io)
+
+        n_vertices = self.read_uint16(binary_io)
+        n_texture_coords = self.read_uint16(binary_io)
+        n_groups = self.read_uint16(binary_io)
+        binary_io.seek(self.VECTOR3_STRUCT.size * n_vertices + self.VECTOR2_STRUCT.size * n_texture_coords, 1)
+
+        groups = []
+        for i in range(n_groups):
+            n_faces = self.read_uint16(binary_io)
+            groups.append({'lighting_material': self.read_string(binary_io), 'face_count': n_faces})
+            binary_io.seek(self.FACE_STRUCT.size * n_faces, 1)
+
+        mesh['cull_type'] = 'NO_CULL' if self.read_uint8(binary_io) == 0 else 'BACKFACE_CULL'
+        binary_io.seek(self.UINT16_BYTES_SIZE, 1)  # end of node
+
+        mesh['vertex_count'] = n_vertices
+        mesh['texture_coord_count'] = n_texture_coords
+        mesh['face_count'] = sum(group['face_count'] for group in groups)
+        mesh['vertex_lighting_groups'] = groups
+        return mesh
+
+    def skip_mesh_node(self, binary_io: BinaryIO):
+        """skips over a mesh node without decoding the vertex, uv and face payloads"""
+        self.read_mesh_summary(binary_io)
+
+    def decode_mesh_node(self, raw_bytes, version: float):
+        """decodes the raw bytes of a mesh node that was skipped by a lazy read"""
+        reader = SodReader(raw_bytes, version)
+        try:
+            return self.read_mesh_node(reader)
+        finally:
+            reader.release()
+
+    def write_mesh_node(self, mesh: dict, binary_io: SodWriter):
+        if binary_io.version > 1.61:
             self.write_string(mesh['texture_material'], binary_io)
 
-        if self.curr_sod_version > 1.9101:
+        if binary_io.version > 1.9101:
             self.write_uint32(0, binary_io)  # unused
             self.write_uint32(mesh['bump_map'], binary_io)
 
         self.write_string(mesh['texture'], binary_io)
 
-        if self.curr_sod_version == 1.91:
+        if abs(binary_io.version - 1.91) < 0.0001:
             self.write_uint16(0, binary_io)  # unknown
 
         # borg texture (assimilated entity)
-        if self.curr_sod_version > 1.9101:
+        if binary_io.version > 1.9101:
             self.write_uint16(0, binary_io)  # unknown
             self.write_uint16(0, binary_io)  # unknown
 
@@ -691,11 +1756,8 @@ class SodIO:
         self.write_uint16(n_texture_coords, binary_io)
         self.write_uint16(n_groups, binary_io)
 
-        for vertex in mesh['vertices']:
-            self.write_vector3(vertex, binary_io)
-
-        for texture_coord in mesh['texture_coordinates']:
-            self.write_vector2(texture_coord, binary_io)
+        self.write_vector3_array(mesh['vertices'], binary_io)
+        self.write_vector2_array(mesh['texture_coordinates'], binary_io)
 
         for vlg in mesh['vertex_lighting_groups']:
             self.write_vertex_lighting_group(vlg, binary_io)
@@ -721,7 +1783,7 @@ class SodIO:
         else:
             return None
 
-    def write_typed_node(self, node_type: NodeType, node_data, binary_io: BinaryIO):
+    def write_typed_node(self, node_type: NodeType, node_data, binary_io: SodWriter):
         if node_type is NodeType.NULL_OR_HARDPOINT:
             self.write_null_node(node_data, binary_io)
         elif node_type is NodeType.LOD_CONTROL:
@@ -733,24 +1795,103 @@ class SodIO:
         elif node_type is NodeType.EMITTER:
             self.write_emitter_node(node_data, binary_io)
 
+    def read_node_header(self, binary_io: BinaryIO):
+        """reads type, id and parent of a node, the local transform follows"""
+        node = {}
+        node_type = NodeType(self.read_uint16(binary_io))  # 0 = null/hardpoint, 1 = mesh, 3 = sprite, 11 = LOD control node, 12 = emitter
+        node['type'] = node_type.name
+        node['id'] = self.read_string(binary_io)
+        node['parent'] = self.read_string(binary_io)  # None if root node
+        return node_type, node
+
     def read_nodes(self, binary_io: BinaryIO):
         nodes = []
         n_nodes = self.read_uint16(binary_io)
 
         for i in range(0, n_nodes):
-            node = {}
-            node_type = NodeType(self.read_uint16(binary_io))  # 0 = null/hardpoint, 1 = mesh, 3 = sprite, 11 = LOD control node, 12 = emitter
-            node['type'] = node_type.name
-            node['id'] = self.read_string(binary_io)
-            node['parent'] = self.read_string(binary_io)  # None if root node
-
-            node['local_transform'] = self.read_matrix34(binary_io)  # right, up, front, position
-            node['data'] = self.read_typed_node(node_type, binary_io)
-            nodes.append(node)
+            nodes.append(self.read_single_node(binary_io))
 
         return nodes
 
-    def write_nodes(self, nodes: list, binary_io: BinaryIO):
+    def read_lod_nodes(self, binary_io: BinaryIO, lod) -> tuple:
+        """
+        Reads the nodes of the selected LOD only, see SodIO.__init__ for the selection.
+        The node headers are skimmed first (mesh payloads are skipped) to resolve the LOD control children,
+        then only the nodes outside of the unselected LOD subtrees are decoded.
+
+        Returns the nodes and the ids of the skipped nodes.
+        """
+        offsets = []
+        headers = []
+        n_nodes = self.read_uint16(binary_io)
+        for i in range(n_nodes):
+            offsets.append(binary_io.tell())
+            node_type, header = self.read_node_header(binary_io)
+            binary_io.seek(self.MATRIX34_STRUCT.size, 1)  # local transform
+            if node_type is NodeType.MESH:
+                self.skip_mesh_node(binary_io)
+            else:
+                self.read_typed_node(node_type, binary_io)
+            headers.append(header)
+        end = binary_io.tell()
+
+        skipped = self.get_unselected_lod_nodes(headers, lod)
+        if skipped:
+            print(f"skipping {len(skipped)} nodes of unselected LODs")
+
+        nodes = []
+        for i, offset in enumerate(offsets):
+            if i not in skipped:
+                binary_io.seek(offset)
+                nodes.append(self.read_single_node(binary_io))
+        binary_io.seek(end)
+        return nodes, {headers[i]['id'] for i in skipped}
+
+    @staticmethod
+    def get_unselected_lod_nodes(headers: list, lod) -> set:
+        """returns the indices of all nodes in the subtrees of the LODs that aren't selected"""
+        children = {}
+        for i, header in enumerate(headers):
+            children.setdefault(header['parent'], []).append(i)
+
+        skipped = set()
+        for header in headers:
+            if header['type'] != NodeType.LOD_CONTROL.name:
+                continue
+            lods = sorted(children.get(header['id'], []), key=lambda i: parse_lod_level(headers[i]['id']))  # stable for equal levels
+            if not lods:
+                continue
+            if lod == 'highest':
+                selected = lods[0]
+            elif lod == 'lowest':
+                selected = lods[-1]
+            else:
+                selected = lods[min(lod, len(lods) - 1)]
+
+            stack = [i for i in lods if i != selected]
+            while stack:
+                i = stack.pop()
+                if i not in skipped:
+                    skipped.add(i)
+                    stack.extend(children.get(headers[i]['id'], ()))
+        return skipped
+
+    def read_single_node(self, binary_io: BinaryIO) -> Node:
+        node_type, header = self.read_node_header(binary_io)
+        local_transform = self.read_matrix34(binary_io)  # right, up, front, position
+
+        if self.lazy_meshes and node_type is NodeType.MESH:
+            # only record the byte range of the mesh, it's decoded when node.data is accessed the first time
+            start = binary_io.tell()
+            self.skip_mesh_node(binary_io)
+            end = binary_io.tell()
+            binary_io.seek(start)
+            decode = partial(self.decode_mesh_node, version=binary_io.version)  # keeps the version for decoding later on
+            return Node.lazy(header['type'], header['id'], header['parent'], local_transform, decode, bytes(binary_io.read(end - start)))
+
+        return Node(header['type'], header['id'], header['parent'], local_transform, self.read_typed_node(node_type, binary_io))
+
+    def write_nodes(self, nodes: list, binary_io: SodWriter):
         n_nodes = len(nodes)
         self.write_uint16(n_nodes, binary_io)
 
@@ -769,7 +1910,7 @@ class SodIO:
         channels = self.read_anim_channel_array(n_channels, binary_io)
         return channels
 
-    def write_animation_transforms(self, channels: list, binary_io: BinaryIO):
+    def write_animation_transforms(self, channels: list, binary_io: SodWriter):
         n_channels = len(channels)
         self.write_uint16(n_channels, binary_io)
         for channel in channels:
@@ -784,8 +1925,94 @@ class SodIO:
         references = self.read_anim_reference_array(n_references, binary_io)
         return references
 
-    def write_anim_tex_refs(self, references: list, binary_io: BinaryIO):
+    def write_anim_tex_refs(self, references: list, binary_io: SodWriter):
         n_references = len(references)
         self.write_uint16(n_references, binary_io)
         for reference in references:
             self.write_anim_reference(reference, binary_io)
+
+
+class SodPatcher:
+    """
+    Overwrites fixed-size fields (node transforms, material colors, animation periods) of an existing sod file in place.
+    The field offsets come from the node offset index, so only the patched bytes are written and nothing is re-serialized.
+    Fields that would change the size of the file (names, meshes, keyframes, ...) have to be written with SodIO.write_file.
+
+    with SodPatcher('ship.sod') as patcher:
+        patcher.set_local_transform('hp01', matrix34)
+        patcher.set_material('default', diffuse_color=[1.0, 0.0, 0.0])
+    """
+
+    def __init__(self, file_path, sod_io: SodIO = None, use_sidecar=False):
+        """:param use_sidecar: load/save the node offset index from/to a sidecar file next to the sod, see SodIO.get_index()"""
+        self.file_path = file_path
+        self.sod_io = sod_io if sod_io else SodIO()
+        self.use_sidecar = use_sidecar
+        self.index = self.sod_io.get_index(file_path, use_sidecar)
+        self.file = open(file_path, 'r+b')
+        self.is_modified = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.close()
+        if self.is_modified:
+            # offsets are unchanged, only the file stats of the index have to be refreshed
+            stat = os.stat(self.file_path)
+            self.index['file_size'] = stat.st_size
+            self.index['file_mtime'] = stat.st_mtime_ns
+            if self.use_sidecar:
+                self.sod_io.save_index(self.file_path, self.index)
+
+    def find_entry(self, entries: list, key: str, value: str) -> dict:
+        entry = next((entry for entry in entries if entry[key] == value), None)
+        if entry is None:
+            raise KeyError(f"'{value}' not found in {self.file_path}")
+        return entry
+
+    def pack_at(self, offset: int, struct_: struct.Struct, *values):
+        self.file.seek(offset)
+        self.file.write(struct_.pack(*values))
+        self.is_modified = True
+
+    def set_local_transform(self, node_id: str, local_transform):
+        """local_transform: 3x3 rotation followed by the position, see SodIO.read_matrix34"""
+        entry = self.find_entry(self.index['nodes'], 'id', node_id)
+        values = [value for row in local_transform for value in row]
+        self.pack_at(entry['transform_offset'], SodIO.MATRIX34_STRUCT, *values)
+
+    def set_material(self, name: str, ambient_color=None, diffuse_color=None, specular_color=None,
+                     specular_shininess=None, lighting_model: LightingModel = None, self_illumination_enabled=None):
+        """only the given fields are overwritten"""
+        entry = self.find_entry(self.index['materials'], 'name', name)
+        offset = entry['colors_offset']
+        color_size = SodIO.VECTOR3_STRUCT.size
+
+        for i, color in enumerate((ambient_color, diffuse_color, specular_color)):
+            if color is not None:
+                self.pack_at(offset + i * color_size, SodIO.VECTOR3_STRUCT, *color)
+        offset += 3 * color_size
+
+        if specular_shininess is not None:
+            self.pack_at(offset, SodIO.FLOAT_STRUCT, specular_shininess)
+        offset += SodIO.FLOAT_STRUCT.size
+
+        if lighting_model is not None:
+            self.pack_at(offset, SodIO.UINT8_STRUCT, LightingModel(lighting_model).value)
+        offset += SodIO.UINT8_STRUCT.size
+
+        if self_illumination_enabled is not None:
+            if self.index['version'] <= 1.8001:
+                raise Exception('Self illumination is not supported by sod version ' + str(self.index['version']))
+            self.pack_at(offset, SodIO.UINT8_STRUCT, 1 if self_illumination_enabled else 0)
+
+    def set_anim_period(self, node_ref: str, period: float):
+        """sets the period of the animation channel referring to node_ref"""
+        entry = self.find_entry(self.index['anim_transforms'], 'node_ref', node_ref)
+        self.pack_at(entry['period_offset'], SodIO.FLOAT_STRUCT, period)
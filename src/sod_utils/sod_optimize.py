@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Vertex cache optimization of the triangle order of SOD meshes
+__author__ = 'Elenterius'
+
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, it's only required for array backed meshes
+    np = None
+
+CACHE_SIZE = 32
+
+# scoring constants of "Linear-Speed Vertex Cache Optimisation" by Tom Forsyth
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+
+def vertex_score(cache_position: int, remaining_triangles: int, cache_size=CACHE_SIZE) -> float:
+    if remaining_triangles == 0:
+        return -1.0  # not used by any triangle that still has to be emitted
+
+    score = 0.0
+    if cache_position < 0:
+        pass  # not in the cache
+    elif cache_position < 3:
+        score = LAST_TRIANGLE_SCORE  # used by the last triangle, fixed score so it isn't reused right away
+    else:
+        scaler = 1.0 / (cache_size - 3)
+        score = (1.0 - (cache_position - 3) * scaler) ** CACHE_DECAY_POWER
+
+    # boost vertices with few remaining triangles, so lone triangles don't get left behind
+    return score + VALENCE_BOOST_SCALE * remaining_triangles ** -VALENCE_BOOST_POWER
+
+
+def forsyth_order(triangles: list, n_vertices: int, cache_size=CACHE_SIZE) -> list:
+    """
+    Returns the triangle order that greedily emits the triangle with the best cache score next.
+
+    :param triangles: list of (a, b, c) vertex keys in range(n_vertices)
+    """
+    vertex_triangles = [[] for _ in range(n_vertices)]
+    for i, triangle in enumerate(triangles):
+        for v in triangle:
+            vertex_triangles[v].append(i)
+
+    remaining = [len(faces) for faces in vertex_triangles]
+    cache_positions = [-1] * n_vertices
+    scores = [vertex_score(-1, count, cache_size) for count in remaining]
+    triangle_scores = [scores[a] + scores[b] + scores[c] for a, b, c in triangles]
+    is_emitted = [False] * len(triangles)
+
+    order = []
+    cache = []
+    next_unemitted = 0
+    best = max(range(len(triangles)), key=triangle_scores.__getitem__) if triangles else None
+    while len(order) < len(triangles):
+        if best is None:
+            # the cache ran dry (e.g. a disconnected part), continue with the next triangle in the input order
+            while is_emitted[next_unemitted]:
+                next_unemitted += 1
+            best = next_unemitted
+
+        is_emitted[best] = True
+        order.append(best)
+        triangle = triangles[best]
+        for v in triangle:
+            remaining[v] -= 1
+            vertex_triangles[v].remove(best)
+
+        # LRU: the vertices of the emitted triangle move to the front
+        new_cache = list(triangle) + [v for v in cache if v not in triangle]
+        evicted = new_cache[cache_size:]
+        cache = new_cache[:cache_size]
+        for v in evicted:
+            cache_positions[v] = -1
+            scores[v] = vertex_score(-1, remaining[v], cache_size)
+        for position, v in enumerate(cache):
+            cache_positions[v] = position
+            scores[v] = vertex_score(position, remaining[v], cache_size)
+
+        # only the triangles of vertices that changed their score have to be re-scored
+        best = None
+        best_score = -1.0
+        for v in chain(cache, evicted):
+            for i in vertex_triangles[v]:
+                a, b, c = triangles[i]
+                score = triangle_scores[i] = scores[a] + scores[b] + scores[c]
+                if score > best_score:
+                    best = i
+                    best_score = score
+    return order
+
+
+def compute_acmr(triangles: list, cache_size=CACHE_SIZE) -> float:
+    """average cache miss ratio (transformed vertices per triangle) of a FIFO post-transform cache, 0.5 is about optimal"""
+    if not triangles:
+        return 0.0
+    cache = []
+    cached = set()
+    misses = 0
+    for triangle in triangles:
+        for v in triangle:
+            if v not in cached:
+                misses += 1
+                cache.append(v)
+                cached.add(v)
+                if len(cache) > cache_size:
+                    cached.discard(cache.pop(0))
+    return misses / len(triangles)
+
+
+def get_mesh_triangles(mesh) -> list:
+    """returns the faces of all vertex lighting groups as triangles of (vertex index, texture coordinate index) keys"""
+    n_texture_coords = max(len(mesh['texture_coordinates']), 1)
+    triangles = []
+    for group in mesh['vertex_lighting_groups']:
+        for face in group['faces']:
+            triangles.append(tuple(int(v) * n_texture_coords + int(t) for v, t in face))
+    return triangles
+
+
+def optimize_mesh(mesh, cache_size=CACHE_SIZE):
+    """
+    Reorders the faces within each vertex lighting group for the post-transform vertex cache and renumbers
+    the vertices and texture coordinates in order of first use for fetch locality. The mesh is modified in place.
+
+    Returns the average cache miss ratio before and after the optimization.
+    """
+    acmr_before = compute_acmr(get_mesh_triangles(mesh), cache_size)
+
+    # the game welds each (vertex, texture coordinate) pair into one hardware vertex, so these are the cache keys
+    for group in mesh['vertex_lighting_groups']:
+        faces = [[(int(v), int(t)) for v, t in face] for face in group['faces']]
+        keys = {}
+        triangles = [tuple(keys.setdefault(corner, len(keys)) for corner in face) for face in faces]
+        order = forsyth_order(triangles, len(keys), cache_size)
+        group['faces'] = [faces[i] for i in order]
+
+    vertex_map = first_use_order(len(mesh['vertices']), (v for group in mesh['vertex_lighting_groups'] for face in group['faces'] for v, _ in face))
+    uv_map = first_use_order(len(mesh['texture_coordinates']), (t for group in mesh['vertex_lighting_groups'] for face in group['faces'] for _, t in face))
+
+    mesh['vertices'] = reorder(mesh['vertices'], vertex_map)
+    mesh['texture_coordinates'] = reorder(mesh['texture_coordinates'], uv_map)
+    for group in mesh['vertex_lighting_groups']:
+        faces = [[[vertex_map[v], uv_map[t]] for v, t in face] for face in group['faces']]
+        if is_ndarray_mesh(mesh):
+            faces = np.array(faces, dtype=np.uint16).reshape(-1, 3, 2)
+        group['faces'] = faces
+
+    acmr_after = compute_acmr(get_mesh_triangles(mesh), cache_size)
+    return acmr_before, acmr_after
+
+
+def first_use_order(n: int, indices) -> list:
+    """maps old -> new index, indices are numbered in order of first use, unused ones keep their relative order at the end"""
+    mapping = [-1] * n
+    next_index = 0
+    for i in indices:
+        if mapping[i] < 0:
+            mapping[i] = next_index
+            next_index += 1
+    for i in range(n):
+        if mapping[i] < 0:
+            mapping[i] = next_index
+            next_index += 1
+    return mapping
+
+
+def reorder(values, mapping: list):
+    """moves values[old] to new position mapping[old]"""
+    inverse = [0] * len(mapping)
+    for old, new in enumerate(mapping):
+        inverse[new] = old
+    if np is not None and isinstance(values, np.ndarray):
+        return values[np.array(inverse, dtype=np.intp)] if len(inverse) else values
+    return [values[old] for old in inverse]
+
+
+def is_ndarray_mesh(mesh) -> bool:
+    return np is not None and isinstance(mesh['vertices'], np.ndarray)
+
+
+def optimize_sod(sod, cache_size=CACHE_SIZE) -> dict:
+    """
+    Optimizes all meshes of the sod in place and returns {node_id: (acmr_before, acmr_after)}.
+    Run it before writing the sod, the cached mesh buffers and bounds of the sod are cleared.
+    """
+    report = {}
+    for node in sod.meshes:
+        report[node['id']] = acmr = optimize_mesh(node['data'], cache_size)
+        print(f"optimized mesh '{node['id']}': ACMR {acmr[0]:.3f} -> {acmr[1]:.3f}")
+    sod.clear_mesh_caches()
+    return report
@@ -55,6 +55,32 @@ def parse_sod(filename: str):
     #         print(node["id"],  node["type"])
 
 
+def print_summary(filename: str):
+    file_path = f'D:\\Program Files (x86)\\Activision\\Star Trek Armada II\\SOD\\{filename}.sod'
+    summary = SodIO().scan_summary(file_path)  # doesn't decode vertices, uvs and faces
+
+    print(f"{summary['file_name']} (SOD Format Version: {summary['version']:.2f})")
+    print("Materials:", summary['materials'])
+    for node in summary['nodes']:
+        if 'mesh' in node:
+            mesh = node['mesh']
+            print(f"{node['id']} <- {node['parent']}: {mesh['vertex_count']} vertices, {mesh['face_count']} faces, texture: {mesh['texture']}")
+
+
+def check_compress_zero_period():
+    from sod_utils.sod_io import AnimChannel
+    from sod_utils.sod_anim import compress_channel, SCALE_CHANNEL, TRANSFORM_CHANNEL
+
+    # channels without a period are pinned to their first key, their keys must not be dropped
+    scales = AnimChannel('hp01', 0.0, SCALE_CHANNEL, [1.0, 2.0, 3.0, 4.0])
+    assert compress_channel(scales, 1e-4) == 4 and scales['keyframe_data'] == [1.0, 2.0, 3.0, 4.0]
+
+    keys = [[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [float(i), 0.0, 0.0]] for i in range(4)]
+    transforms = AnimChannel('hp01', 0.0, TRANSFORM_CHANNEL, keys)
+    assert compress_channel(transforms, 1e-4) == 4 and transforms['keyframe_data'] == keys
+    print("zero period channels keep their keys")
+
+
 import numpy as np
 import mathutils
 
@@ -65,6 +91,8 @@ if __name__ == '__main__':
     # dump_sod('fconst')
     # parse_sod('fconst')
     # parse_sod('fbattle')
+    # print_summary('8472_mother')
+    # check_compress_zero_period()
 
     # right up front
     vectors = np.array([[1.0, 0.0, -0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 0.9999999403953552]])